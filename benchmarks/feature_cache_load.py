@@ -0,0 +1,84 @@
+"""
+Compares cold-load time and peak memory of the feature cache formats.
+
+Usage:
+    python -m benchmarks.feature_cache_load [--rows N] [--cols N] [--repeats N]
+
+Every load runs in a fresh interpreter so its peak RSS is measured on its own. The matrix is
+fully read after loading (a sum over every value) so lazily memory-mapped caches pay for their
+reads too. Pages of a memory-mapped cache count towards RSS once read, but are backed by the
+file and shared between processes. The files are read back right after being written, so the
+OS page cache is warm.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+
+from benchmarks.resources import peak_rss_mb
+from src.features.cache_format import CACHE_FORMATS, cache_path, load_feature_matrix, save_feature_matrix
+
+
+def _child(stem: Path, cache_format: str):
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    X, y = load_feature_matrix(stem, cache_format)
+    load_time = time.perf_counter() - start
+    load_rss = peak_rss_mb() - baseline_rss
+    checksum = float(np.sum(X, dtype=np.float64)) + float(np.sum(y))
+    total_time = time.perf_counter() - start
+    print(json.dumps({
+        "load_s": load_time,
+        "load_and_read_s": total_time,
+        "load_rss_mb": load_rss,
+        "peak_rss_mb": peak_rss_mb() - baseline_rss,
+        "checksum": checksum,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading of the feature cache formats")
+    parser.add_argument("--rows", type=int, default=20000)
+    # Width of the per-chord HPCP feature set
+    parser.add_argument("--cols", type=int, default=192)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("STEM", "FORMAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        _child(Path(args.child[0]), args.child[1])
+        return
+
+    rng = np.random.default_rng(0)
+    X = rng.random((args.rows, args.cols))
+    y = rng.integers(0, 2, args.rows)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stem = Path(temp_dir) / "benchmark-features"
+        print(f"Feature matrix: {args.rows} x {args.cols} {X.dtype} ({X.nbytes / 1024 ** 2:.1f} MB)")
+        print(f"{'format':<8} {'size MB':>9} {'load ms':>9} {'load+read ms':>13} {'load RSS MB':>12} {'peak RSS MB':>12}")
+        for cache_format in CACHE_FORMATS:
+            save_feature_matrix(stem, X, y, cache_format)
+            size_mb = cache_path(stem, cache_format).stat().st_size / 1024 ** 2
+
+            runs = []
+            for _ in range(args.repeats):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.feature_cache_load", "--child", str(stem), cache_format],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+
+            load_ms = np.median([run["load_s"] for run in runs]) * 1000
+            read_ms = np.median([run["load_and_read_s"] for run in runs]) * 1000
+            load_mb = np.median([run["load_rss_mb"] for run in runs])
+            peak_mb = np.median([run["peak_rss_mb"] for run in runs])
+            print(f"{cache_format:<8} {size_mb:>9.1f} {load_ms:>9.1f} {read_ms:>13.1f} {load_mb:>12.1f} {peak_mb:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
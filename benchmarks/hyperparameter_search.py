@@ -0,0 +1,98 @@
+"""
+Compares the hyperparameter searches against the serial grids they replace.
+
+Usage:
+    python -m benchmarks.hyperparameter_search [--feature-type TYPE] [--samples N] [--workers N]
+
+With a feature type its cached feature set is used, otherwise a synthetic dataset of N samples.
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from src.features.loading import FEATURE_EXTRACTORS, FEATURE_TYPES
+from src.models.search import logistic_regression_c_path, search_hyperparameters
+from src.utils import split_dataset
+
+C_VALUES = np.logspace(-3, 3, 7)
+GAMMA_VALUES = np.logspace(-4, 0, 5)
+LR_C_VALUES = np.logspace(-4, 4, 10)
+
+
+def _serial_svm_grid(X_train, y_train, X_val, y_val):
+    """The exhaustive grid the SVM search replaces, one fit after another"""
+    best_score, best_params = -1.0, None
+    for C in C_VALUES:
+        for gamma in GAMMA_VALUES:
+            svm = make_pipeline(StandardScaler(), SVC(kernel="rbf", C=C, gamma=gamma))
+            svm.fit(X_train, y_train)
+            score = svm.score(X_val, y_val)
+            if score > best_score:
+                best_score, best_params = score, (C, gamma)
+    return best_params
+
+
+def _cold_lr_path(X_train, y_train, X_val, y_val):
+    """The C path the warm-started one replaces, every fit starting from scratch"""
+    val_scores = []
+    for C in LR_C_VALUES:
+        model = make_pipeline(StandardScaler(), LogisticRegression(C=C, max_iter=1000, random_state=42))
+        model.fit(X_train, y_train)
+        val_scores.append(accuracy_score(y_val, model.predict(X_val)))
+    return np.array(val_scores)
+
+
+def _test_score(params, X_train, y_train, X_test, y_test):
+    svm = make_pipeline(StandardScaler(), SVC(kernel="rbf", C=params[0], gamma=params[1]))
+    return svm.fit(X_train, y_train).score(X_test, y_test)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hyperparameter searches")
+    parser.add_argument("--feature-type", type=str, choices=FEATURE_TYPES, default=None)
+    parser.add_argument("--samples", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=-1)
+    args = parser.parse_args()
+
+    if args.feature_type is not None:
+        X, y = FEATURE_EXTRACTORS[args.feature_type].load_cached_features()
+        X, y = np.asarray(X), np.asarray(y)
+    else:
+        X, y = make_classification(n_samples=args.samples, n_features=96, n_informative=24, random_state=0)
+    X_train, y_train, X_val, y_val, X_test, y_test = split_dataset(X, y)
+    print(f"{len(y_train)} training, {len(y_val)} validation samples with {X.shape[1]} features")
+
+    start = time.perf_counter()
+    serial_params = _serial_svm_grid(X_train, y_train, X_val, y_val)
+    serial_time = time.perf_counter() - start
+    print(f"SVM serial grid:     {serial_time:8.2f}s  C={serial_params[0]:g} gamma={serial_params[1]:g} "
+          f"test accuracy {_test_score(serial_params, X_train, y_train, X_test, y_test):.4f}")
+
+    svm = make_pipeline(StandardScaler(), SVC(kernel="rbf"))
+    param_grid = {"svc__C": list(C_VALUES), "svc__gamma": list(GAMMA_VALUES)}
+    for strategy in ["grid", "halving"]:
+        result = search_hyperparameters(svm, param_grid, X_train, y_train, X_val, y_val, strategy, args.workers)
+        params = (result.best_params["svc__C"], result.best_params["svc__gamma"])
+        print(f"SVM {result.strategy + ' search:':<17}{result.elapsed_seconds:8.2f}s  C={params[0]:g} gamma={params[1]:g} "
+              f"test accuracy {_test_score(params, X_train, y_train, X_test, y_test):.4f}  "
+              f"{serial_time - result.elapsed_seconds:.2f}s saved, {result.num_fits} fits")
+
+    start = time.perf_counter()
+    cold_scores = _cold_lr_path(X_train, y_train, X_val, y_val)
+    cold_time = time.perf_counter() - start
+    result, _, _ = logistic_regression_c_path(
+        LogisticRegression(max_iter=1000, random_state=42), LR_C_VALUES, X_train, y_train, X_val, y_val)
+    print(f"LR cold C path:      {cold_time:8.2f}s")
+    print(f"LR warm C path:      {result.elapsed_seconds:8.2f}s  {cold_time - result.elapsed_seconds:.2f}s saved, "
+          f"{result.exhaustive_seconds:.2f}s estimated cold, "
+          f"max validation accuracy diff {np.max(np.abs(cold_scores - result.scores)):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measures how long the command line takes to start, and which modules it imports on the way.
+
+Usage:
+    python -m benchmarks.import_time [--repeats N] [--budget-ms MS] [--top N]
+
+Every command runs in a fresh interpreter under `python -X importtime`. Printing the help of a
+command must not import any of HEAVY_MODULES and must finish within the budget, otherwise the
+benchmark exits with status 1 so startup regressions are caught.
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+COMMAND_LINES = [
+    ["main.py", "--help"],
+    ["main.py", "run", "--help"],
+    ["main.py", "generate", "--help"],
+    ["main.py", "extract", "--help"],
+    ["main.py", "train", "--help"],
+    ["main.py", "predict", "--help"],
+    ["predict.py", "--help"],
+    ["serve.py", "--help"],
+]
+# Libraries only the commands themselves may import, once they run
+HEAVY_MODULES = ["sklearn", "scipy", "matplotlib", "librosa", "music21", "py7zr", "sf2utils", "midiutil", "joblib"]
+
+
+def _import_times(stderr: str) -> list[tuple[str, int, int]]:
+    """:return: (module, self_us, cumulative_us) of every module imported at the top level"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented below the module importing them
+        if name.startswith("  "):
+            continue
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def _run(command_line: list[str]) -> tuple[float, str]:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *command_line], cwd=PROJECT_DIR,
+                            capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the command line")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs of every command, the fastest one is reported")
+    parser.add_argument("--budget-ms", type=float, default=500,
+                        help="Longest startup time allowed for printing the help of a command")
+    parser.add_argument("--top", type=int, default=3, help="Number of slowest top level imports listed per command")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'command':<28} {'wall ms':>9} {'imports ms':>11}  slowest imports")
+    for command_line in COMMAND_LINES:
+        runs = [_run(command_line) for _ in range(args.repeats)]
+        wall_seconds, stderr = min(runs, key=lambda run: run[0])
+        imports = _import_times(stderr)
+        imports_ms = sum(cumulative_us for _, _, cumulative_us in imports) / 1000
+
+        slowest = sorted(imports, key=lambda module: module[2], reverse=True)[:args.top]
+        slowest_str = ", ".join(f"{name} {cumulative_us / 1000:.0f}" for name, _, cumulative_us in slowest)
+        name = " ".join(command_line[:-1])
+        print(f"{name:<28} {wall_seconds * 1000:9.1f} {imports_ms:11.1f}  {slowest_str}")
+
+        imported = {line.split("|")[-1].strip() for line in stderr.splitlines() if line.startswith("import time:")}
+        heavy = [module for module in HEAVY_MODULES if module in imported]
+        if heavy:
+            failures.append(f"{name} imports {', '.join(heavy)}")
+        if wall_seconds * 1000 > args.budget_ms:
+            failures.append(f"{name} took {wall_seconds * 1000:.1f} ms, over the budget of {args.budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("Every command starts within the budget without importing any heavy module")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Compares the batched per-chord feature path against computing every chord segment separately.
+
+Usage:
+    python -m benchmarks.per_chord_features [wave_file] [--repeats N]
+
+Without a wave file a synthetic 16 second progression of sine chords is used. The reference computes the MFCCs,
+CQT chroma and Tonnetz of every chord segment from its samples with librosa, as the extractors did before they
+shared and batched their spectral intermediates, so it does not depend on any code of src.features.
+"""
+import argparse
+import time
+import warnings
+import librosa.feature
+import numpy as np
+from pathlib import Path
+
+import src.constants as c
+from src.features.analysis import AudioAnalysis
+from src.features.hpcp import HPCPExtractor, HPCPAndTonnetzExtractor
+from src.features.mfcc import NUM_MFCCS, PerChordMFCCExtractor
+from src.features.tonnetz import PerChordTonnetzExtractor
+from src.features.utils import load_audio_file, get_chord_segments
+
+# Largest absolute difference allowed between the batched and the per-segment features
+TOLERANCE = 1e-5
+
+
+def _synthetic_signal(seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(c.SAMPLES_PER_CHORD) / c.SAMPLE_RATE
+    chords = []
+    for root in 220 * 2 ** (rng.integers(0, 12, c.NUM_CHORDS) / 12):
+        chord = sum(np.sin(2 * np.pi * root * ratio * t) for ratio in (1, 1.26, 1.5)) / 3
+        chords.append(chord)
+    return np.concatenate(chords).astype(np.float32)
+
+
+def _mean_and_std(feature):
+    return np.concatenate((np.mean(feature, axis=1), np.std(feature, axis=1)))
+
+
+def _segment_features(segment):
+    """Features of a single chord segment, computed from its samples with the librosa calls the extractors replaced"""
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore')
+        mfcc = librosa.feature.mfcc(y=segment, sr=c.SAMPLE_RATE, n_mfcc=NUM_MFCCS)
+        hpcp = librosa.feature.chroma_cqt(y=segment, sr=c.SAMPLE_RATE)
+        tonnetz = librosa.feature.tonnetz(y=segment, sr=c.SAMPLE_RATE)
+    return {
+        PerChordMFCCExtractor.FEATURE_NAME: _mean_and_std(mfcc),
+        PerChordTonnetzExtractor.FEATURE_NAME: _mean_and_std(tonnetz),
+        HPCPExtractor.FEATURE_NAME: _mean_and_std(hpcp),
+        HPCPAndTonnetzExtractor.FEATURE_NAME: np.concatenate((np.mean(hpcp, axis=1), np.mean(tonnetz, axis=1))),
+    }
+
+
+def _per_segment_features(signal):
+    """Reference implementation running librosa on every chord segment separately, independent of src.features"""
+    segments = [_segment_features(segment) for segment in get_chord_segments(signal)]
+    return {name: np.array([features[name] for features in segments]).flatten() for name in segments[0]}
+
+
+def _batched_features(signal):
+    analysis = AudioAnalysis(signal)
+    return {
+        extractor.FEATURE_NAME: extractor.extract_features_from_analysis(analysis)
+        for extractor in [PerChordMFCCExtractor, PerChordTonnetzExtractor, HPCPExtractor, HPCPAndTonnetzExtractor]
+    }
+
+
+def _time(fn, signal, repeats):
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(signal)
+        times.append(time.perf_counter() - start)
+    return result, float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched per-chord feature extraction")
+    parser.add_argument("wave_file", type=Path, nargs="?", default=None)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    signal = load_audio_file(args.wave_file) if args.wave_file is not None else _synthetic_signal()
+
+    # Warm up librosa's filter and numba caches so neither path pays for them
+    _batched_features(signal)
+    _per_segment_features(signal)
+
+    reference, reference_time = _time(_per_segment_features, signal, args.repeats)
+    batched, batched_time = _time(_batched_features, signal, args.repeats)
+
+    print(f"Per-segment: {reference_time * 1000:8.1f} ms/file")
+    print(f"Batched:     {batched_time * 1000:8.1f} ms/file")
+    print(f"Speedup:     {reference_time / batched_time:8.2f}x")
+    for name, features in batched.items():
+        max_diff = float(np.max(np.abs(features - reference[name])))
+        status = "ok" if max_diff <= TOLERANCE else "MISMATCH"
+        print(f"  {name:<18} max abs diff {max_diff:.2e} ({status})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Times every stage of the pipeline on a small synthetic corpus and records the results to JSON.
+
+Usage:
+    python -m benchmarks.pipeline [--songs N] [--progressions N] [--seed S] [--train-feature-type type]
+                                  [--output results.json] [--compare baseline.json] [--workspace DIR]
+
+Everything is written to a temporary workspace, the dataset, caches and models of the project are never touched.
+The stages run in order, each in a fresh interpreter so its peak RSS is its own:
+
+- progression-generation: creates --progressions songs, drawing their progressions, keys and presets
+- midi-writing: writes the MIDI file of every song of the corpus
+- fluidsynth-rendering: renders the corpus with FluidSynth. Skipped when neither the fluidsynth cli nor pyfluidsynth
+  is available, or no soundfont is set up, in which case the corpus is synthesized from sine waves instead
+- corpus: synthesizes every song from the sine waves of its notes, written like a rendered dataset
+- audio-decode: decodes every wave file of the dataset
+- extract-<feature type>: extracts and caches every feature type on its own, without the per-file feature store
+- cache-load: loads every cached feature set
+- train-<model>: tunes and trains every model on --train-feature-type, without plots or a learning curve
+
+Songs are generated with --seed, so runs of different commits time the same corpus. Timings include the first call
+costs of every library (numba compilation, ...) but not their imports. Results hold the wall time, items per second
+and peak RSS of every stage along with the commit they were measured on. --compare prints the speedup of the
+throughput of every stage against an earlier results file.
+"""
+import argparse
+import contextlib
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import src.constants as c
+import src.paths as paths
+from benchmarks.resources import peak_rss_mb
+
+STAGES = [
+    "progression-generation",
+    "midi-writing",
+    "fluidsynth-rendering",
+    "corpus",
+    "audio-decode",
+    *[f"extract-{feature_type}" for feature_type in c.FEATURE_TYPES],
+    "cache-load",
+    *[f"train-{model_type}" for model_type in c.MODEL_TYPES],
+]
+# Catalog entry used when no soundfont is set up, songs only need a preset to be created
+_PLACEHOLDER_SOUNDFONT = {
+    "path": "placeholder.sf2",
+    "fingerprint": {},
+    "presets": [{"name": "Placeholder", "bank": 0, "preset": 0}],
+}
+_FADE_SECONDS = 0.01
+
+
+class StageSkipped(Exception):
+    pass
+
+
+def _use_workspace(workspace: Path):
+    """Points every path of the project into the workspace, before any module reads them"""
+    for name, value in list(vars(paths).items()):
+        if isinstance(value, Path) and name != "PROJECT_DIR" and value.is_relative_to(paths.PROJECT_DIR):
+            setattr(paths, name, workspace / value.relative_to(paths.PROJECT_DIR))
+
+
+def _soundfonts_available(catalog: dict) -> bool:
+    return all(Path(soundfont["path"]).exists() for soundfont in catalog.values())
+
+
+def _setup_catalog(workspace_catalog: Path, project_catalog: Path):
+    """Copies the soundfont catalog of the project into the workspace, or a placeholder when it has no soundfonts"""
+    catalog = {}
+    if project_catalog.exists():
+        catalog = json.loads(project_catalog.read_text())
+    if not catalog or not _soundfonts_available(catalog):
+        catalog = {"placeholder": _PLACEHOLDER_SOUNDFONT}
+
+    workspace_catalog.parent.mkdir(parents=True, exist_ok=True)
+    workspace_catalog.write_text(json.dumps(catalog, indent=2))
+
+
+def _create_songs(num_songs: int, seed: int) -> list:
+    from src.setup.songs import create_songs
+
+    return list(create_songs(num_songs, seed=seed))
+
+
+def _synthesize(song):
+    """Sine waves of the notes of a song, as int16 stereo samples like the rendered songs"""
+    import numpy as np
+    from src.music.song import BPM
+
+    seconds_per_beat = 60 / BPM
+    signal = np.zeros(c.SAMPLES_PER_WAVE)
+    fade = np.minimum(1, np.arange(c.SAMPLES_PER_CHORD) / (_FADE_SECONDS * c.SAMPLE_RATE))
+    for note in song.notes():
+        start = int(note.time * seconds_per_beat * c.SAMPLE_RATE)
+        length = min(int(note.duration * seconds_per_beat * c.SAMPLE_RATE), c.SAMPLES_PER_WAVE - start)
+        frequency = 440 * 2 ** ((note.pitch - 69) / 12)
+        t = np.arange(length) / c.SAMPLE_RATE
+        envelope = fade[:length] * fade[:length][::-1] * np.exp(-t)
+        signal[start:start + length] += envelope * np.sin(2 * np.pi * frequency * t)
+
+    signal *= 0.5 / np.max(np.abs(signal))
+    samples = (signal * np.iinfo(np.int16).max).astype(np.int16)
+    return np.stack([samples, samples], axis=1)
+
+
+def _write_dataset(songs: list, write):
+    """
+    Writes the songs and their info manifests like generate_songs, without setting up the soundfonts
+    :param write: Function writing the wave file of a song to its path
+    """
+    paths.INFO_DIR.mkdir(parents=True, exist_ok=True)
+    with paths.INFO_DIATONIC_TXT.open("w") as diatonic_info, paths.INFO_NON_DIATONIC_TXT.open("w") as non_diatonic_info:
+        for song, path in songs:
+            write(song, path)
+            info = diatonic_info if song.is_diatonic else non_diatonic_info
+            info.write(f"{song.string_info()}\n")
+
+
+def _wave_files() -> list[Path]:
+    return sorted(paths.DATA_DIATONIC_DIR.glob("*.wav")) + sorted(paths.DATA_NON_DIATONIC_DIR.glob("*.wav"))
+
+
+def _run_stage(stage: str, args: argparse.Namespace):
+    """
+    Runs a stage of the pipeline. Modules are imported before the stage is timed
+    :return: (items, run): the number of items the stage processes and a function running it
+    """
+    if stage == "progression-generation":
+        from src.setup.songs import create_songs  # noqa: F401
+
+        return args.progressions, lambda: _create_songs(args.progressions // 2, args.seed)
+
+    if stage == "midi-writing":
+        songs = _create_songs(args.songs, args.seed)
+        # Builds the voicing table of the workspace, so only the MIDI files are timed
+        for song, _ in songs:
+            song.notes()
+        midi_dir = paths.TEMP_DIR / "midi"
+        return len(songs), lambda: [song._write_midi(midi_dir / path.name) for song, path in songs]
+
+    if stage == "fluidsynth-rendering":
+        from src.music.fluidsynth import pyfluidsynth
+        from src.soundfonts import _load_catalog
+
+        if shutil.which("fluidsynth") is None and pyfluidsynth is None:
+            raise StageSkipped("neither the fluidsynth cli nor pyfluidsynth is installed")
+        if "placeholder" in _load_catalog():
+            raise StageSkipped(f"no soundfonts are set up in {args.project_catalog}")
+        songs = _create_songs(args.songs, args.seed)
+        return len(songs), lambda: _write_dataset(songs, lambda song, path: song.write(path))
+
+    if stage == "corpus":
+        if _wave_files():
+            raise StageSkipped("the songs were rendered with FluidSynth")
+        songs = _create_songs(args.songs, args.seed)
+        return len(songs), lambda: _write_dataset(songs, lambda song, path: song.write_samples(path, _synthesize(song)))
+
+    if stage == "audio-decode":
+        from src.features.utils import load_audio_file
+
+        files = _wave_files()
+        return len(files), lambda: [load_audio_file(filepath) for filepath in files]
+
+    if stage.startswith("extract-"):
+        from src.features.loading import FEATURE_EXTRACTORS
+
+        extractor = FEATURE_EXTRACTORS[stage.removeprefix("extract-")]
+        num_files = len(_wave_files()) if extractor.REQUIRES_AUDIO else 2 * args.songs
+        return num_files, lambda: extractor.save_features(*extractor.extract_features_from_dataset())
+
+    if stage == "cache-load":
+        from src.features.loading import FEATURE_EXTRACTORS
+
+        extractors = [extractor for extractor in FEATURE_EXTRACTORS.values() if extractor.has_cached_features()]
+        if not extractors:
+            raise StageSkipped("no feature set was cached")
+        # Every row is read, so memory-mapped caches pay for their reads too
+        return len(extractors), lambda: [extractor.load_cached_features()[0].sum() for extractor in extractors]
+
+    if stage.startswith("train-"):
+        from src.features.loading import FEATURE_EXTRACTORS
+        from src.models.logistic_regression import train_logistic_regression
+        from src.models.svm import train_svm
+
+        extractor = FEATURE_EXTRACTORS[args.train_feature_type]
+        if not extractor.has_cached_features():
+            raise StageSkipped(f"the {args.train_feature_type} features were not extracted")
+        X, y = extractor.load_cached_features()
+        if stage == "train-logistic-regression":
+            return len(X), lambda: train_logistic_regression(X, y, learning_curve_sizes=0, seed=args.seed)
+        return len(X), lambda: train_svm(X, y, learning_curve_sizes=0, seed=args.seed)
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def _child(stage: str, args: argparse.Namespace):
+    """Runs a single stage and prints its measurements as the last line of its output"""
+    _use_workspace(args.workspace)
+    if not paths.SOUNDFONTS_CATALOG.exists():
+        _setup_catalog(paths.SOUNDFONTS_CATALOG, args.project_catalog)
+
+    # The output of the stage goes to stderr, so only the measurements are printed to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            items, run = _run_stage(stage, args)
+            start = time.perf_counter()
+            run()
+            measurements = {"status": "ok", "items": items, "wall_seconds": time.perf_counter() - start}
+        except StageSkipped as e:
+            measurements = {"status": "skipped", "reason": str(e)}
+    measurements["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(measurements))
+
+
+def _measure_stage(stage: str, args: argparse.Namespace) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.pipeline", "--child", stage,
+        "--workspace", str(args.workspace), "--songs", str(args.songs), "--progressions", str(args.progressions),
+        "--seed", str(args.seed), "--train-feature-type", args.train_feature_type,
+    ]
+    result = subprocess.run(command, cwd=paths.PROJECT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit status {result.returncode}"
+        return {"name": stage, "status": "failed", "reason": error}
+
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    if measurements["status"] == "ok":
+        measurements["items_per_second"] = measurements["items"] / measurements["wall_seconds"]
+    return {"name": stage, **measurements}
+
+
+def _commit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=paths.PROJECT_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def _print_stage(stage: dict, baseline: dict | None):
+    if stage["status"] != "ok":
+        print(f"{stage['name']:<26} {stage['status']}: {stage['reason']}")
+        return
+
+    line = (f"{stage['name']:<26} {stage['wall_seconds']:9.3f} {stage['items']:7} "
+            f"{stage['items_per_second']:10.1f} {stage['peak_rss_mb']:9.1f}")
+    if baseline is not None and baseline.get("status") == "ok":
+        # Throughputs are compared rather than wall times, so runs on corpora of different sizes stay comparable
+        line += (f"  {stage['items_per_second'] / baseline['items_per_second']:6.2f}x "
+                 f"{stage['peak_rss_mb'] - baseline['peak_rss_mb']:+8.1f}")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the pipeline on a synthetic corpus")
+    parser.add_argument("--songs", type=int, default=20, help="Number of songs of every label in the corpus")
+    parser.add_argument("--progressions", type=int, default=2000,
+                        help="Number of songs created by the progression generation stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--train-feature-type", type=str, default="hpcp-tonnetz", choices=c.FEATURE_TYPES,
+                        help="Feature set the models are trained on")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Results file, benchmarks/results/pipeline-<commit>.json in the temp folder by default")
+    parser.add_argument("--compare", type=Path, default=None,
+                        help="Earlier results file to print the speedup and change of peak RSS of every stage against")
+    parser.add_argument("--workspace", type=Path, default=None,
+                        help="Folder the corpus, caches and models are written to, a temporary one by default")
+    parser.add_argument("--child", type=str, choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    # The workspace gets its own catalog, based on the one of the project
+    args.project_catalog = paths.SOUNDFONTS_CATALOG
+
+    if args.child is not None:
+        _child(args.child, args)
+        return
+
+    baselines = {}
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        baselines = {stage["name"]: stage for stage in baseline["stages"]}
+        print(f"Compared against {args.compare} (commit {baseline.get('commit')})")
+        if (baseline.get("seed"), baseline.get("songs")) != (args.seed, args.songs):
+            print(f"The baseline corpus has {baseline.get('songs')} songs of seed {baseline.get('seed')}, "
+                  f"timings of a different corpus are only roughly comparable")
+
+    commit = _commit()
+    results = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "songs": args.songs,
+        "progressions": args.progressions,
+        "train_feature_type": args.train_feature_type,
+        "stages": [],
+    }
+
+    header = f"{'stage':<26} {'wall s':>9} {'items':>7} {'items/s':>10} {'peak RSS':>9}"
+    print(header + ("  speedup  RSS diff" if baselines else ""))
+    with contextlib.ExitStack() as stack:
+        if args.workspace is None:
+            args.workspace = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="pipeline-benchmark-")))
+        for stage in STAGES:
+            measurements = _measure_stage(stage, args)
+            results["stages"].append(measurements)
+            _print_stage(measurements, baselines.get(stage))
+
+    output = args.output or paths.TEMP_DIR / "benchmarks" / "results" / f"pipeline-{(commit or 'unknown')[:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Wrote results to {output}")
+
+    if any(stage["status"] == "failed" for stage in results["stages"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares the batch progression generator against generating progressions one at a time.
+
+Usage:
+    python -m benchmarks.progression_generation [--count N] [--reference-count N] [--seed S]
+
+Both generators are checked to follow the same distribution, by comparing how often every
+function appears at every position and how many secondary dominants every progression holds.
+"""
+import argparse
+import random
+import time
+import numpy as np
+
+import src.music.generation as gen
+from src.music.function import Function
+
+LENGTH = 8
+# Largest difference allowed between the frequencies of the two generators
+TOLERANCE = 0.01
+
+
+def _statistics(progressions: np.ndarray) -> np.ndarray:
+    """Frequency of every function at every position, followed by the distribution of secondary dominant counts"""
+    position_frequencies = np.stack([
+        (progressions == code).mean(axis=0) for code in range(len(gen.FUNCTIONS))
+    ]).flatten()
+    secondary_dominants = (progressions == gen.FUNCTION_CODES[Function.SecondaryDominant]).sum(axis=1)
+    count_frequencies = np.bincount(secondary_dominants, minlength=LENGTH + 1) / len(progressions)
+    return np.concatenate([position_frequencies, count_frequencies])
+
+
+def _reference_progressions(generate, count: int) -> np.ndarray:
+    return np.array([[gen.FUNCTION_CODES[f] for f in generate(LENGTH)] for _ in range(count)], dtype=np.int8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch progression generation")
+    parser.add_argument("--count", type=int, default=1_000_000, help="Number of progressions generated in a batch")
+    parser.add_argument("--reference-count", type=int, default=100_000,
+                        help="Number of progressions generated one at a time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    generators = [
+        ("diatonic", gen.generate_diatonic_progression, gen.generate_diatonic_progressions),
+        ("non-diatonic", gen.generate_non_diatonic_progression, gen.generate_non_diatonic_progressions),
+    ]
+    for name, generate_one, generate_batch in generators:
+        start = time.perf_counter()
+        reference = _reference_progressions(generate_one, args.reference_count)
+        reference_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = generate_batch(args.count, LENGTH, rng=args.seed)
+        batch_time = time.perf_counter() - start
+
+        reproducible = np.array_equal(batch, generate_batch(args.count, LENGTH, rng=args.seed))
+        max_diff = float(np.max(np.abs(_statistics(batch) - _statistics(reference))))
+        status = "ok" if max_diff <= TOLERANCE and reproducible else "MISMATCH"
+
+        print(f"{name}:")
+        print(f"  One at a time: {args.reference_count / reference_time:12,.0f} progressions/s")
+        print(f"  Batch:         {args.count / batch_time:12,.0f} progressions/s ({batch_time:.3f} s for {args.count:,})")
+        print(f"  Speedup:       {args.count / batch_time / (args.reference_count / reference_time):12.1f}x")
+        print(f"  Max frequency diff {max_diff:.4f}, reproducible with seed: {reproducible} ({status})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""Resource measurements shared by the benchmarks"""
+import resource
+import sys
+from pathlib import Path
+
+
+def peak_rss_mb() -> float:
+    """:return: Peak resident set size of the current process in megabytes"""
+    # ru_maxrss can carry over the parent's peak across exec on Linux, the high water mark of this process does not
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
@@ -0,0 +1,92 @@
+"""
+Checks that seeded songs can be regenerated on their own, in any order and in parallel, identical to a serial run.
+
+Usage:
+    python -m benchmarks.seeded_generation [--songs N] [--subset N] [--workers N] [--seed S]
+
+The songs of a dataset are created serially with create_songs, then a random subset of them is created again with
+create_song in a process pool, in shuffled order. Every song must have the same progression, key and soundfont
+preset and write byte for byte the same MIDI file, otherwise the benchmark exits with status 1. Both runs are timed.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import src.paths as paths
+from src.setup.songs import create_song, create_songs
+
+# Used when no soundfont catalog is set up, songs only need a preset to be created
+_PLACEHOLDER_CATALOG = {"placeholder": {"path": "placeholder.sf2", "presets": [{"name": "Piano", "bank": 0, "preset": 0}]}}
+
+
+def _use_catalog(catalog_path: Path):
+    paths.SOUNDFONTS_CATALOG = catalog_path
+
+
+def _identity(song, midi_path: Path) -> tuple:
+    song._write_midi(midi_path)
+    return song.is_diatonic, song.progression, song.key, song.sf_preset, midi_path.read_bytes()
+
+
+def _regenerate(job: tuple[int, bool, int, Path]) -> tuple:
+    seed, is_diatonic, index, midi_dir = job
+    song, path = create_song(seed, is_diatonic, index)
+    return _identity(song, midi_dir / f"regenerated-{path.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that seeded songs are regenerated identically")
+    parser.add_argument("--songs", type=int, default=500, help="Number of songs of every label")
+    parser.add_argument("--subset", type=int, default=200, help="Number of songs regenerated on their own")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        catalog_path = paths.SOUNDFONTS_CATALOG
+        if not catalog_path.exists():
+            catalog_path = temp_dir / "catalog.json"
+            catalog_path.write_text(json.dumps(_PLACEHOLDER_CATALOG))
+        _use_catalog(catalog_path)
+
+        start = time.perf_counter()
+        serial = {
+            (song.is_diatonic, int(path.stem.rsplit("_", 1)[1])): _identity(song, temp_dir / path.name)
+            for song, path in create_songs(args.songs, seed=args.seed)
+        }
+        serial_seconds = time.perf_counter() - start
+
+        subset = random.Random(args.seed).sample(sorted(serial), min(args.subset, len(serial)))
+        jobs = [(args.seed, is_diatonic, index, temp_dir) for is_diatonic, index in subset]
+        start = time.perf_counter()
+        with ProcessPoolExecutor(args.workers, initializer=_use_catalog, initargs=(catalog_path,)) as executor:
+            regenerated = list(executor.map(_regenerate, jobs))
+        parallel_seconds = time.perf_counter() - start
+
+        mismatches = [key for key, identity in zip(subset, regenerated) if identity != serial[key]]
+        # The same seed must give the same dataset, and another seed a different one
+        reproducible = [identity for _, identity in serial.items()] == [
+            _identity(song, temp_dir / path.name) for song, path in create_songs(args.songs, seed=args.seed)
+        ]
+        other_seed = [_identity(song, temp_dir / path.name) for song, path in create_songs(args.songs, seed=args.seed + 1)]
+        distinct = other_seed != list(serial.values())
+
+    print(f"Created {len(serial)} songs serially in {serial_seconds:.2f}s")
+    print(f"Regenerated {len(subset)} of them in shuffled order with {args.workers} workers in {parallel_seconds:.2f}s")
+    print(f"Same seed gives the same songs: {'OK' if reproducible else 'FAIL'}")
+    print(f"Another seed gives other songs: {'OK' if distinct else 'FAIL'}")
+    for is_diatonic, index in mismatches:
+        print(f"FAIL: {'diatonic' if is_diatonic else 'non-diatonic'} song {index} differs when regenerated")
+    if mismatches or not reproducible or not distinct:
+        sys.exit(1)
+    print("Every regenerated song is identical to the serial run")
+
+
+if __name__ == "__main__":
+    main()
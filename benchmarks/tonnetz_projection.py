@@ -0,0 +1,81 @@
+"""
+Compares the NumPy Tonnetz projection against librosa.feature.tonnetz on precomputed chroma.
+
+Usage:
+    python -m benchmarks.tonnetz_projection [--files N] [--frames N] [--repeats N]
+
+Random chroma of shape (files, NUM_CHORDS, 12, frames) is projected by librosa one chord segment at a time, as the
+extractors used to, and by project_tonnetz one file at a time and for every file at once. Frames without energy
+and integer pitch class profiles, like the symbolic ones, are checked too. The benchmark exits with status 1 if
+any projection differs from librosa by more than TOLERANCE.
+"""
+import argparse
+import sys
+import time
+import librosa.feature
+import numpy as np
+
+import src.constants as c
+from src.features.tonnetz import NUM_PITCH_CLASSES, project_tonnetz
+
+# Largest absolute difference allowed between the projections
+TOLERANCE = 1e-6
+
+
+def _best_time(function, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Tonnetz projection")
+    parser.add_argument("--files", type=int, default=200)
+    # Frames of the CQT chroma of a two second chord segment
+    parser.add_argument("--frames", type=int, default=173)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    chroma = rng.random((args.files, c.NUM_CHORDS, NUM_PITCH_CLASSES, args.frames), dtype=np.float32)
+    # Silent frames are left unnormalized by librosa
+    chroma[0, 0, :, :10] = 0
+
+    checks = {
+        "float32 chroma": (project_tonnetz(chroma), librosa.feature.tonnetz(chroma=chroma)),
+    }
+    # librosa normalizes integer chroma in place into integers, so it is given the profiles as floats
+    profiles = rng.integers(0, 4, (c.NUM_CHORDS, NUM_PITCH_CLASSES)).T
+    checks["integer profiles"] = (project_tonnetz(profiles), librosa.feature.tonnetz(chroma=profiles.astype(float)))
+
+    failed = False
+    for name, (projected, expected) in checks.items():
+        max_diff = float(np.max(np.abs(projected - expected)))
+        ok = projected.shape == expected.shape and projected.dtype == expected.dtype and max_diff <= TOLERANCE
+        failed |= not ok
+        print(f"{name:<17} shape {projected.shape} {projected.dtype}, max diff {max_diff:.2e} {'OK' if ok else 'FAIL'}")
+
+    num_segments = args.files * c.NUM_CHORDS
+    timings = [
+        ("librosa per segment", lambda: [librosa.feature.tonnetz(chroma=segment) for file in chroma for segment in file]),
+        ("numpy per segment", lambda: [project_tonnetz(segment) for file in chroma for segment in file]),
+        ("numpy per file", lambda: [project_tonnetz(file) for file in chroma]),
+        ("numpy all files", lambda: project_tonnetz(chroma)),
+    ]
+    print(f"{args.files} files of {c.NUM_CHORDS} chord segments with {args.frames} chroma frames")
+    print(f"{'projection':<20} {'time ms':>9} {'segments/s':>12}")
+    reference_time = None
+    for name, function in timings:
+        seconds = _best_time(function, args.repeats)
+        reference_time = reference_time or seconds
+        print(f"{name:<20} {seconds * 1000:9.1f} {num_segments / seconds:12.0f}  {reference_time / seconds:6.1f}x")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,81 +3,401 @@ os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 os.environ["TF_CPP_MIN_LOG_LEVEL"]  = "2"
 
 import argparse
+import sys
+from pathlib import Path
 
-from src.setup.songs import NUM_DEFAULT_SONGS, setup_songs
-from src.setup.soundfonts import setup_soundfonts
-from src.models.logistic_regression import train_logistic_regression
-from src.models.svm import train_svm
-from src.features.loading import load_features
-from src.visualization.box_plot import plot_mfcc_per_chord_box_plot
-from src.visualization.scatter_plot import plot_mfcc_mean_vs_std_scatter_plot, plot_tonnetz_mean_scatter_plot
+import src.constants as c
+import src.paths as paths
+from src.features.cache_format import CACHE_FORMATS, DEFAULT_CACHE_FORMAT
+from src.instrumentation import export_metrics, run_profiled, summary
+from predict import add_prediction_arguments, predict_files
+
+# Every command imports the heavy libraries it needs (sklearn, matplotlib, librosa, music21, ...) only once it runs,
+# so building the command line and printing the help stays fast
+COMMANDS = ["run", "generate", "extract", "train", "predict"]
+DEFAULT_COMMAND = "run"
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="A program to classify weather an "
-                    "eight chord long chord progression "
-                    "is diatonic or contains secondary dominants")
 
+def _parse_feature_types(value: str) -> list[str]:
+    if value == "all":
+        return list(c.FEATURE_TYPES)
 
+    feature_types = [feature_type.strip() for feature_type in value.split(",") if feature_type.strip()]
+    for feature_type in feature_types:
+        if feature_type not in c.FEATURE_TYPES:
+            raise argparse.ArgumentTypeError(
+                f"invalid feature type: '{feature_type}' (choose from 'all', {', '.join(map(repr, c.FEATURE_TYPES))})")
+    if not feature_types:
+        raise argparse.ArgumentTypeError("at least one feature type is required")
+    return feature_types
+
+
+def _add_feature_type_argument(parser: argparse.ArgumentParser, required: bool = True):
     parser.add_argument(
-        "--gen-songs",
-        type=int,
-        nargs="?",
-        const=NUM_DEFAULT_SONGS,
-        default=None,
-        help="Number of songs to generate"
+        "--feature-type",
+        type=_parse_feature_types,
+        required=required,
+        help="The type of features to extract from the dataset. Either one of "
+             f"{', '.join(c.FEATURE_TYPES)}, a comma separated list of them, or 'all'"
     )
+
+
+def _add_generation_arguments(parser: argparse.ArgumentParser):
     parser.add_argument(
-        "--regen-features",
+        "--stream",
         action="store_true",
-        help="Regenerate the cached features on disk"
+        help="Generate the songs in memory and extract their features directly, "
+             "without writing any audio to disk. Only the features and the info manifests are kept"
     )
     parser.add_argument(
-        "--feature-type",
+        "--unique-progressions",
+        action="store_true",
+        help="Give every generated song of a label a distinct chord progression, "
+             "sampled uniformly from every valid progression of the label"
+    )
+    parser.add_argument(
+        "--render-cache",
+        action="store_true",
+        help="Reuse the audio and features of previously rendered songs with the same progression, key, "
+             "soundfont preset and tempo instead of rendering them again"
+    )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=1,
+        help="Number of songs rendered with FluidSynth at once when generating songs"
+    )
+    parser.add_argument(
+        "--synth-backend",
         type=str,
-        required=True,
-        choices=[
-            "global-mfcc", "per-chord-mfcc",
-            "global-tonnetz", "per-chord-tonnetz",
-            "hpcp", "hpcp-tonnetz"
-        ],
-        help="The type of features to extract from the dataset"
+        default=c.DEFAULT_SYNTHESIS_BACKEND,
+        choices=c.SYNTHESIS_BACKENDS,
+        help="How songs are synthesized. library renders in-process with pyfluidsynth, subprocess runs the "
+             "fluidsynth cli for every song, auto uses the library whenever pyfluidsynth is installed"
     )
 
+
+def _add_extraction_arguments(parser: argparse.ArgumentParser, regen_features: bool = True):
+    if regen_features:
+        parser.add_argument(
+            "--regen-features",
+            action="store_true",
+            help="Regenerate the cached features on disk"
+        )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to extract features and to fit hyperparameter candidates, "
+             "-1 uses every core"
+    )
+    parser.add_argument(
+        "--cache-format",
+        type=str,
+        default=DEFAULT_CACHE_FORMAT,
+        choices=list(CACHE_FORMATS),
+        help="Format of the cached feature sets. raw is memory-mapped on load, npz is compressed"
+    )
+
+
+def _add_training_arguments(parser: argparse.ArgumentParser):
     parser.add_argument(
         "--model",
         type=str,
         required = True,
-        choices=["logistic-regression", "svm"]
+        choices=c.MODEL_TYPES
+    )
+    parser.add_argument(
+        "--learning-curve-sizes",
+        type=int,
+        default=c.DEFAULT_LEARNING_CURVE_SIZES,
+        help="Number of training set sizes the learning curve is computed for, each fitted once per fold. "
+             "0 skips the learning curve"
+    )
+    parser.add_argument(
+        "--search",
+        type=str,
+        default=c.DEFAULT_SEARCH_STRATEGY,
+        choices=c.SEARCH_STRATEGIES,
+        help="How the SVM hyperparameters are searched. 'halving' fits candidates on growing subsets of the "
+             "training split and drops the worst ones after every round, 'grid' fits every candidate on all of it. "
+             "Training splits of fewer than 500 samples, about 420 songs of every label, always use 'grid', "
+             "so the default dataset is searched with 'grid'"
+    )
+    parser.add_argument(
+        "--no-plots",
+        action="store_true",
+        help="Skip every figure, including the learning curve, so training only fits and scores the model"
+    )
+    parser.add_argument(
+        "--plot-workers",
+        type=int,
+        default=-1,
+        help="Number of worker processes rendering the figures once training is done, -1 uses every core"
+    )
+
+
+def _add_seed_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed of the generated songs and of the dataset split. Without it, songs are generated from a random seed, "
+             f"which is printed, and the dataset is split with seed {c.DEFAULT_TRAINING_SEED}"
+    )
+
+
+def _add_instrumentation_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        help="Write the time spent decoding, segmenting, in librosa, FluidSynth, cache I/O and model fits to this file "
+             "once the command is done, in the Prometheus text format for .prom and .txt files and as JSON otherwise"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run the command under cProfile and write the profile to the graphs folder"
     )
-    args = parser.parse_args()
 
-    setup_soundfonts()
 
-    song_count = NUM_DEFAULT_SONGS
+def _check_stream(parser: argparse.ArgumentParser, args: argparse.Namespace, generates: bool):
+    """
+    :param generates: Whether the command generates a new dataset. Streaming replaces the dataset,
+                      so it is refused when the current one would only be reused
+    """
+    if not args.stream:
+        return
+    if not generates:
+        parser.error("--stream replaces the dataset, it requires --gen-songs")
+    if args.feature_type is None:
+        parser.error("--stream requires --feature-type")
+
+
+def _check_unique_progressions(parser: argparse.ArgumentParser, args: argparse.Namespace, song_count: int):
+    if not args.unique_progressions:
+        return
+
+    from src.music.enumeration import ProgressionSpace
+
+    max_songs = min(ProgressionSpace(is_diatonic, c.NUM_CHORDS).count() for is_diatonic in (True, False))
+    if song_count > max_songs:
+        parser.error(f"--unique-progressions allows at most {max_songs} songs per label")
+
+
+def _generate_songs(args: argparse.Namespace, song_count: int, force_setup: bool):
+    """
+    Generates the dataset, or with --stream the feature sets of songs generated in memory
+    :return: Mapping of feature type to (X, y) when streaming, None otherwise
+    """
+    from src.music.fluidsynth import set_synthesis_backend
+    from src.music.render_cache import RenderCache
+
+    set_synthesis_backend(args.synth_backend)
+
+    if args.stream:
+        from src.setup.streaming import stream_songs
+
+        render_cache = RenderCache() if args.render_cache else None
+        return stream_songs(song_count, args.feature_type, args.workers, args.cache_format, render_cache,
+                            args.unique_progressions, args.seed)
+
+    from src.setup.songs import setup_songs
+
+    setup_songs(song_count, force_setup, args.render_workers, args.render_cache, args.unique_progressions, args.seed)
+    return None
+
+
+def _load_feature_sets(args: argparse.Namespace, regen_features: bool):
+    from src.features.loading import load_feature_sets
+
+    return load_feature_sets(args.feature_type, regen_features, args.workers, args.cache_format)
+
+
+def _train_models(args: argparse.Namespace, feature_sets: dict):
+    from src.models.logistic_regression import train_logistic_regression
+    from src.models.persistence import save_model
+    from src.models.svm import train_svm
+    from src.visualization.box_plot import plot_mfcc_per_chord_box_plot
+    from src.visualization.report import Report, render_reports
+    from src.visualization.scatter_plot import plot_mfcc_mean_vs_std_scatter_plot, plot_tonnetz_mean_scatter_plot
+
+    seed = c.DEFAULT_TRAINING_SEED if args.seed is None else args.seed
+    reports = []
+    for feature_type, (X, y) in feature_sets.items():
+        if len(feature_sets) > 1:
+            print(f"===== {feature_type} =====")
+
+        # Figures are only collected while training, they are all rendered once every model is saved
+        report = None
+        if not args.no_plots:
+            report = Report(paths.GRAPHS_DIR / args.model / feature_type)
+            reports.append(report)
+
+            if feature_type == "global-mfcc":
+                plot_mfcc_mean_vs_std_scatter_plot(X, y, report)
+            elif feature_type == "per-chord-mfcc":
+                plot_mfcc_per_chord_box_plot(X, y, report)
+            elif feature_type == "global-tonnetz":
+                plot_tonnetz_mean_scatter_plot(X, y, report)
+
+
+        if args.model == "logistic-regression":
+            model = train_logistic_regression(X, y, args.learning_curve_sizes, report, seed)
+        elif args.model == "svm":
+            model = train_svm(X, y, args.search, args.workers, args.learning_curve_sizes, report, seed)
+        else:
+            raise ValueError(f"Unknown model type: {args.model}")
+
+        model_path = save_model(model, args.model, feature_type)
+        print(f"Saved model to {model_path}")
+
+    if reports:
+        figures = render_reports(reports, args.plot_workers)
+        print(f"Wrote {len(figures)} figures to {paths.GRAPHS_DIR}")
+
+
+def run(args: argparse.Namespace, parser: argparse.ArgumentParser):
+    """Generates the dataset when it is missing, extracts its features and trains the model on them"""
+    song_count = c.NUM_DEFAULT_SONGS
     force_song_setup = False
     if args.gen_songs is not None:
         song_count = args.gen_songs
         force_song_setup = True
-    setup_songs(song_count, force_song_setup)
+    _check_stream(parser, args, force_song_setup)
+    _check_unique_progressions(parser, args, song_count)
+
+    feature_sets = _generate_songs(args, song_count, force_song_setup)
+    if feature_sets is None:
+        feature_sets = _load_feature_sets(args, args.regen_features or force_song_setup)
+    _train_models(args, feature_sets)
+
+
+def generate(args: argparse.Namespace, parser: argparse.ArgumentParser):
+    """Generates a new dataset, replacing the current one"""
+    _check_stream(parser, args, generates=True)
+    _check_unique_progressions(parser, args, args.songs)
+
+    feature_sets = _generate_songs(args, args.songs, force_setup=True)
+    for feature_type, (X, _) in (feature_sets or {}).items():
+        print(f"Cached {X.shape[0]} songs of {X.shape[1]} {feature_type} features")
+
 
-    scaler, X, y = load_features(args.feature_type, args.regen_features or force_song_setup)
-    if args.feature_type == "global-mfcc":
-        plot_mfcc_mean_vs_std_scatter_plot(X, y)
-    elif args.feature_type == "per-chord-mfcc":
-        plot_mfcc_per_chord_box_plot(X, y)
-    elif args.feature_type == "global-tonnetz":
-        plot_tonnetz_mean_scatter_plot(X, y)
+def extract(args: argparse.Namespace, parser: argparse.ArgumentParser):
+    """Extracts and caches the features of the current dataset"""
+    from src.features.loading import FEATURE_EXTRACTORS
 
+    # Audio features are extracted from the wave files, symbolic ones from the info manifests. Streamed datasets
+    # only have the manifests, their audio features can only be loaded from the caches written while streaming
+    to_extract = [
+        FEATURE_EXTRACTORS[feature_type] for feature_type in args.feature_type
+        if args.regen_features or not FEATURE_EXTRACTORS[feature_type].has_cached_features(args.cache_format)
+    ]
+    if any(extractor.REQUIRES_AUDIO for extractor in to_extract):
+        if not any(paths.DATA_DIATONIC_DIR.glob("*.wav")) or not any(paths.DATA_NON_DIATONIC_DIR.glob("*.wav")):
+            parser.error(f"no songs in {paths.DATA_DIR}, generate them first with 'python main.py generate'")
+    if not all(extractor.REQUIRES_AUDIO for extractor in to_extract):
+        if not paths.INFO_DIATONIC_TXT.exists() or not paths.INFO_NON_DIATONIC_TXT.exists():
+            parser.error(f"no info manifests in {paths.INFO_DIR}, generate them first with 'python main.py generate'")
 
-    if args.model == "logistic-regression":
-        train_logistic_regression(X, y)
-    elif args.model == "svm":
-        train_svm(X, y)
+    for feature_type, (X, _) in _load_feature_sets(args, args.regen_features).items():
+        print(f"Cached {X.shape[0]} songs of {X.shape[1]} {feature_type} features")
+
+
+def train(args: argparse.Namespace, parser: argparse.ArgumentParser):
+    """Trains the model on the cached features, extracting the feature sets that are not cached yet"""
+    _train_models(args, _load_feature_sets(args, args.regen_features))
+
+
+def predict(args: argparse.Namespace, parser: argparse.ArgumentParser):
+    """Classifies wave files with a trained model"""
+    predict_files(args, parser)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="A program to classify weather an "
+                    "eight chord long chord progression "
+                    "is diatonic or contains secondary dominants. "
+                    f"Without a command, '{DEFAULT_COMMAND}' is used")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+
+    run_parser = subparsers.add_parser(
+        "run", help="Generate the dataset when it is missing, extract its features and train the model on them")
+    run_parser.add_argument(
+        "--gen-songs",
+        type=int,
+        nargs="?",
+        const=c.NUM_DEFAULT_SONGS,
+        default=None,
+        help="Number of songs to generate"
+    )
+    _add_generation_arguments(run_parser)
+    _add_extraction_arguments(run_parser)
+    _add_feature_type_argument(run_parser)
+    _add_training_arguments(run_parser)
+    _add_seed_argument(run_parser)
+    _add_instrumentation_arguments(run_parser)
+    run_parser.set_defaults(handler=run, command_parser=run_parser)
+
+    generate_parser = subparsers.add_parser("generate", help="Generate a new dataset, replacing the current one")
+    generate_parser.add_argument(
+        "--songs",
+        type=int,
+        default=c.NUM_DEFAULT_SONGS,
+        help="Number of songs of every label to generate"
+    )
+    _add_generation_arguments(generate_parser)
+    _add_extraction_arguments(generate_parser, regen_features=False)
+    _add_feature_type_argument(generate_parser, required=False)
+    _add_seed_argument(generate_parser)
+    _add_instrumentation_arguments(generate_parser)
+    generate_parser.set_defaults(handler=generate, command_parser=generate_parser)
+
+    extract_parser = subparsers.add_parser("extract", help="Extract and cache the features of the current dataset")
+    _add_extraction_arguments(extract_parser)
+    _add_feature_type_argument(extract_parser)
+    _add_instrumentation_arguments(extract_parser)
+    extract_parser.set_defaults(handler=extract, command_parser=extract_parser)
+
+    train_parser = subparsers.add_parser("train", help="Train a model on the cached features")
+    _add_extraction_arguments(train_parser)
+    _add_feature_type_argument(train_parser)
+    _add_training_arguments(train_parser)
+    _add_seed_argument(train_parser)
+    _add_instrumentation_arguments(train_parser)
+    train_parser.set_defaults(handler=train, command_parser=train_parser)
+
+    predict_parser = subparsers.add_parser("predict", help="Classify wave files with a trained model")
+    add_prediction_arguments(predict_parser)
+    _add_instrumentation_arguments(predict_parser)
+    predict_parser.set_defaults(handler=predict, command_parser=predict_parser)
+
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Runs from before the commands existed passed the flags of 'run' directly
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = [DEFAULT_COMMAND] + argv
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return
+
+    if args.profile:
+        run_profiled(paths.GRAPHS_DIR / f"profile-{args.command}.prof", args.handler, args, args.command_parser)
     else:
-        raise ValueError(f"Unknown model type: {args.model}")
+        args.handler(args, args.command_parser)
+
+    if args.metrics is not None:
+        print(summary())
+        print(f"Wrote metrics to {export_metrics(args.metrics)}")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,92 @@
+import time
+_start = time.perf_counter()
+
+import argparse
+import numpy as np
+from pathlib import Path
+
+import src.constants as c
+
+
+def _collect_files(inputs: list[Path], pattern: str = "*.wav") -> list[Path]:
+    filepaths = []
+    for path in inputs:
+        if path.is_dir():
+            filepaths.extend(sorted(path.glob(pattern)))
+        else:
+            filepaths.append(path)
+    return filepaths
+
+
+def add_prediction_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "files",
+        type=Path,
+        nargs="+",
+        help="Wave files to classify, or MIDI files for symbolic models. Directories are searched for them"
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        choices=c.MODEL_TYPES,
+        help="Type of the trained model to load, used with --feature-type"
+    )
+    parser.add_argument(
+        "--feature-type",
+        type=str,
+        choices=c.FEATURE_TYPES,
+        help="Feature type the model was trained on, used with --model"
+    )
+    parser.add_argument(
+        "--artifact",
+        type=Path,
+        help="Path of a saved model, instead of --model and --feature-type"
+    )
+
+
+def predict_files(args: argparse.Namespace, parser: argparse.ArgumentParser):
+    # Imported here, so building the command line does not import librosa and sklearn
+    from src.features.loading import FEATURE_EXTRACTORS
+    from src.models.inference import classify_files
+    from src.models.persistence import get_model_path, load_model
+
+    if args.artifact is not None:
+        artifact_path = args.artifact
+    elif args.model is not None and args.feature_type is not None:
+        artifact_path = get_model_path(args.model, args.feature_type)
+    else:
+        parser.error("either --artifact or both --model and --feature-type are required")
+
+    load_start = time.perf_counter()
+    artifact = load_model(artifact_path)
+    load_seconds = time.perf_counter() - load_start
+    cold_start_seconds = time.perf_counter() - _start
+
+    # Symbolic models classify the MIDI files of songs instead of their audio
+    pattern = "*.wav" if FEATURE_EXTRACTORS[artifact.feature_type].REQUIRES_AUDIO else "*.mid"
+    filepaths = _collect_files(args.files, pattern)
+    predictions, predict_seconds = classify_files(artifact, filepaths)
+
+    for prediction in predictions:
+        if prediction.error is not None:
+            print(f"Unable to process file '{prediction.filepath}': {prediction.error}")
+            continue
+        print(f"{prediction.label:>12}  {prediction.filepath}")
+
+    extract_times = np.array([prediction.extract_seconds for prediction in predictions])
+    print(f"Model:       {artifact.model_type} on {artifact.feature_type} features ({artifact_path})")
+    print(f"Cold start:  {cold_start_seconds * 1000:8.1f} ms (loading the model {load_seconds * 1000:.1f} ms)")
+    if len(predictions):
+        per_file = extract_times + predict_seconds / len(predictions)
+        print(f"Per file:    {per_file.mean() * 1000:8.1f} ms mean, {np.median(per_file) * 1000:.1f} ms median, "
+              f"{per_file.max() * 1000:.1f} ms max over {len(predictions)} files")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify wave files with a model trained by main.py")
+    add_prediction_arguments(parser)
+    predict_files(parser.parse_args(), parser)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import signal
+from pathlib import Path
+
+import src.constants as c
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a model trained by main.py over HTTP")
+    parser.add_argument("--model", type=str, choices=c.MODEL_TYPES,
+                        help="Type of the trained model to serve, used with --feature-type")
+    parser.add_argument("--feature-type", type=str, choices=c.FEATURE_TYPES,
+                        help="Feature type the model was trained on, used with --model")
+    parser.add_argument("--artifact", type=Path, help="Path of a saved model, instead of --model and --feature-type")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes extracting features. Defaults to every core")
+    parser.add_argument("--max-batch-size", type=int, default=32,
+                        help="Largest number of files classified by the model at once")
+    parser.add_argument("--max-wait-ms", type=float, default=10,
+                        help="Longest time a file waits for others to join its batch")
+    args = parser.parse_args()
+
+    # Imported once the arguments are parsed, so the help is printed without importing librosa and sklearn
+    from src.models.persistence import get_model_path, load_model
+    from src.serving.server import InferenceServer, InferenceService
+
+    if args.artifact is not None:
+        artifact_path = args.artifact
+    elif args.model is not None and args.feature_type is not None:
+        artifact_path = get_model_path(args.model, args.feature_type)
+    else:
+        parser.error("either --artifact or both --model and --feature-type are required")
+
+    artifact = load_model(artifact_path)
+    service = InferenceService(artifact, args.workers, args.max_batch_size, args.max_wait_ms)
+    server = InferenceServer((args.host, args.port), service)
+    # Stop as cleanly on a termination request as on ctrl+c
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Serving {artifact.model_type} on {artifact.feature_type} features at http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,4 +3,25 @@ NUM_CHORDS = 8
 
 SAMPLE_RATE = 44100
 SAMPLES_PER_WAVE = NUM_CHORDS * CHORD_LENGTH * SAMPLE_RATE
-SAMPLES_PER_CHORD = CHORD_LENGTH * SAMPLE_RATE
\ No newline at end of file
+SAMPLES_PER_CHORD = CHORD_LENGTH * SAMPLE_RATE
+
+# Names of the feature types, models, searches and synthesis backends. They live here rather than next to their
+# implementations, so the command line can be built without importing librosa, sklearn or pyfluidsynth
+FEATURE_TYPES = ["global-mfcc", "per-chord-mfcc", "global-tonnetz", "per-chord-tonnetz", "hpcp", "hpcp-tonnetz", "symbolic"]
+MODEL_TYPES = ["logistic-regression", "svm"]
+
+# grid: every candidate is fitted on the whole training split
+# halving: successive halving, candidates are fitted on growing subsets of the training split and only
+#          the best 1 / HALVING_FACTOR of them move on to the next, larger subset
+SEARCH_STRATEGIES = ["halving", "grid"]
+DEFAULT_SEARCH_STRATEGY = "halving"
+# library: in-process with pyfluidsynth, subprocess: the fluidsynth cli for every song,
+# auto: the library whenever pyfluidsynth is installed
+SYNTHESIS_BACKENDS = ["auto", "library", "subprocess"]
+DEFAULT_SYNTHESIS_BACKEND = "auto"
+# Number of training set sizes the learning curve is computed for, 0 skips it
+DEFAULT_LEARNING_CURVE_SIZES = 20
+# Seed of the dataset split and of the hyperparameter search when no seed is given
+DEFAULT_TRAINING_SEED = 42
+
+NUM_DEFAULT_SONGS = 200
@@ -0,0 +1,105 @@
+import librosa
+import librosa.feature
+import numpy as np
+import warnings
+from functools import cached_property
+from pathlib import Path
+
+import src.constants as c
+from src.features.utils import load_audio_file, get_chord_segment_matrix
+from src.instrumentation import timed
+
+# Resolution of the pitch class axis used by librosa.feature.chroma_cqt
+CHROMA_BINS_PER_OCTAVE = 36
+# Dynamic range of the log-power mel spectrogram, the default of librosa.power_to_db
+MEL_TOP_DB = 80.0
+
+
+def compute_mel_spectrogram_db(signal) -> np.ndarray:
+    """
+    Log-power mel spectrogram of a signal. Multichannel signals of shape (..., samples)
+    are transformed channel by channel in a single call
+    """
+    with timed("librosa.melspectrogram"):
+        mel = librosa.feature.melspectrogram(y=signal, sr=c.SAMPLE_RATE)
+        mel_db = librosa.power_to_db(mel, top_db=None)
+    # power_to_db clips against the maximum of the whole array, clip every channel against its own maximum instead
+    return np.maximum(mel_db, mel_db.max(axis=(-2, -1), keepdims=True) - MEL_TOP_DB)
+
+
+def compute_chroma(signal, tuning: float | None = None) -> np.ndarray:
+    with warnings.catch_warnings(), timed("librosa.chroma_cqt"):
+        warnings.filterwarnings('ignore')
+        return librosa.feature.chroma_cqt(y=signal, sr=c.SAMPLE_RATE, tuning=tuning)
+
+
+def compute_segment_chroma(segments: np.ndarray) -> np.ndarray:
+    """
+    CQT chroma of every row of a (num_segments, samples) matrix.
+    librosa estimates a single tuning for a multichannel CQT, so the segments are grouped by
+    their own tuning estimate and each group is transformed in one batched call. This gives
+    the same chroma as running chroma_cqt on every segment separately
+    :return: Array of shape (num_segments, 12, frames)
+    """
+    with warnings.catch_warnings(), timed("librosa.estimate_tuning"):
+        warnings.filterwarnings('ignore')
+        tunings = np.array([
+            librosa.estimate_tuning(y=segment, sr=c.SAMPLE_RATE, bins_per_octave=CHROMA_BINS_PER_OCTAVE)
+            for segment in segments
+        ])
+
+    chroma = None
+    for tuning in np.unique(tunings):
+        group = tunings == tuning
+        group_chroma = compute_chroma(segments[group], tuning=tuning)
+        if chroma is None:
+            chroma = np.empty((len(segments),) + group_chroma.shape[1:], dtype=group_chroma.dtype)
+        chroma[group] = group_chroma
+    return chroma
+
+
+class AudioAnalysis:
+    """
+    Decoded signal of a single song along with the intermediates shared between feature extractors.
+    Every intermediate is computed the first time it is requested and reused afterwards, so building
+    several feature sets from the same analysis only decodes the file and runs each transform once.
+    Per-chord intermediates are computed for all chords at once and have a leading chord axis.
+    """
+
+    def __init__(self, signal: np.ndarray):
+        self.signal = signal
+
+
+    @classmethod
+    def from_file(cls, filepath: Path) -> "AudioAnalysis":
+        return cls(load_audio_file(filepath))
+
+
+    @cached_property
+    def segments(self) -> np.ndarray:
+        """Signal split into a (NUM_CHORDS, SAMPLES_PER_CHORD) matrix"""
+        return get_chord_segment_matrix(self.signal)
+
+
+    @cached_property
+    def mel_db(self) -> np.ndarray:
+        """Log-power mel spectrogram of the whole signal, the input to the MFCC"""
+        return compute_mel_spectrogram_db(self.signal)
+
+
+    @cached_property
+    def segment_mel_db(self) -> np.ndarray:
+        """Log-power mel spectrogram of every chord segment, shape (NUM_CHORDS, n_mels, frames)"""
+        return compute_mel_spectrogram_db(self.segments)
+
+
+    @cached_property
+    def chroma(self) -> np.ndarray:
+        """CQT chroma of the whole signal, shared by the HPCP and Tonnetz features"""
+        return compute_chroma(self.signal)
+
+
+    @cached_property
+    def segment_chroma(self) -> np.ndarray:
+        """CQT chroma of every chord segment, shape (NUM_CHORDS, 12, frames)"""
+        return compute_segment_chroma(self.segments)
@@ -0,0 +1,105 @@
+import json
+import numpy as np
+from pathlib import Path
+
+from src.files import atomic_write
+from src.instrumentation import timed
+
+# raw: uncompressed arrays behind a small JSON header, memory-mapped on load without copying
+# npz: zlib compressed numpy archive, smaller on disk but decompressed into memory on load
+CACHE_FORMATS: dict[str, str] = {
+    "raw": ".bin",
+    "npz": ".npz",
+}
+DEFAULT_CACHE_FORMAT = "raw"
+
+_RAW_MAGIC = b"SDDFEAT\x01"
+_RAW_HEADER_SIZE_BYTES = 8
+# Arrays start on cache line boundaries so memory-mapped reads are aligned
+_RAW_ALIGNMENT = 64
+
+
+def _validate_cache_format(cache_format: str):
+    if cache_format not in CACHE_FORMATS:
+        raise ValueError(f"Invalid cache format {cache_format}. Format must be one of {list(CACHE_FORMATS)}")
+
+
+def _align(size: int) -> int:
+    return -(-size // _RAW_ALIGNMENT) * _RAW_ALIGNMENT
+
+
+def cache_path(stem: Path, cache_format: str) -> Path:
+    _validate_cache_format(cache_format)
+    return stem.with_name(stem.name + CACHE_FORMATS[cache_format])
+
+
+def _save_raw(f, arrays: dict[str, np.ndarray]):
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += _align(array.nbytes)
+    header = json.dumps({"arrays": entries}).encode()
+    data_start = _align(len(_RAW_MAGIC) + _RAW_HEADER_SIZE_BYTES + len(header))
+
+    f.write(_RAW_MAGIC)
+    f.write(len(header).to_bytes(_RAW_HEADER_SIZE_BYTES, "little"))
+    f.write(header)
+    for name, array in arrays.items():
+        f.write(b"\0" * (data_start + entries[name]["offset"] - f.tell()))
+        array.tofile(f)
+
+
+def _load_raw(path: Path) -> dict[str, np.ndarray]:
+    with path.open("rb") as f:
+        if f.read(len(_RAW_MAGIC)) != _RAW_MAGIC:
+            raise ValueError(f"{path} is not a raw feature cache")
+        header_size = int.from_bytes(f.read(_RAW_HEADER_SIZE_BYTES), "little")
+        header = json.loads(f.read(header_size))
+    data_start = _align(len(_RAW_MAGIC) + _RAW_HEADER_SIZE_BYTES + header_size)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        if 0 in shape:
+            # Empty arrays cannot be memory-mapped
+            arrays[name] = np.empty(shape, dtype=dtype)
+            continue
+        arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + entry["offset"], shape=shape)
+    return arrays
+
+
+@timed("cache.save")
+def save_feature_matrix(stem: Path, X: np.ndarray, y: np.ndarray, cache_format: str = DEFAULT_CACHE_FORMAT) -> Path:
+    """
+    Saves features and labels into a single cache file
+    :param stem: Path of the cache file without its extension
+    :return: Path of the written cache file
+    """
+    path = cache_path(stem, cache_format)
+    with atomic_write(path) as f:
+        if cache_format == "raw":
+            _save_raw(f, {"X": X, "y": y})
+        else:
+            np.savez_compressed(f, X=X, y=y)
+    return path
+
+
+@timed("cache.load")
+def load_feature_matrix(stem: Path, cache_format: str = DEFAULT_CACHE_FORMAT) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Loads features and labels from a cache file. Raw caches are memory-mapped read-only,
+    npz caches are decompressed into memory
+    :param stem: Path of the cache file without its extension
+    :return: (X, y)
+    """
+    path = cache_path(stem, cache_format)
+    if cache_format == "raw":
+        arrays = _load_raw(path)
+        return arrays["X"], arrays["y"]
+
+    with np.load(path) as loaded_data:
+        return loaded_data["X"], loaded_data["y"]
@@ -1,82 +1,227 @@
-import joblib
 import numpy as np
 from abc import ABC, abstractmethod
+from joblib import Parallel, delayed
 from pathlib import Path
-from sklearn.preprocessing import StandardScaler
 from tqdm import tqdm
 
+import src.constants as c
 import src.paths as paths
+from src.features.analysis import AudioAnalysis
+from src.features.cache_format import DEFAULT_CACHE_FORMAT, cache_path, load_feature_matrix, save_feature_matrix
 from src.features.labels import get_label_string_to_num
+from src.features.store import FeatureStore
+from src.instrumentation import call_with_metrics, count, merge_worker_metrics
+
+
+# Number of files handed to a worker at a time when extracting in parallel
+EXTRACTION_CHUNK_SIZE = 16
+
+
+def _list_dataset_files() -> list[tuple[Path, int]]:
+    """
+    Lists every file in the data folder along with its numeric label.
+    Files are sorted so the rows of X and y are stable between runs
+    :return: List of (filepath, label) pairs
+    """
+    files = []
+    for path in sorted(paths.DATA_DIR.iterdir()):
+        if not path.is_dir():
+            continue
+
+        label_str = path.name
+        label_num: int
+        try:
+            label_num = get_label_string_to_num(label_str)
+        except Exception as e:
+            print(f"Invalid label found within data folder: '{label_str}': {e}")
+            continue
+
+        files.extend((filepath, label_num) for filepath in sorted(path.iterdir()))
+    return files
+
+
+def extract_analysis_features(extractors, analysis: AudioAnalysis) -> list[tuple[np.ndarray | None, Exception | None]]:
+    """
+    Extracts every requested feature set from one analysis, so intermediates are shared between them
+    :return: A (features, error) pair for each extractor
+    """
+    results = []
+    for extractor in extractors:
+        try:
+            results.append((extractor.extract_features_from_analysis(analysis), None))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
+
+def _extract_file_safe(extractors, filepath: Path):
+    """
+    Extracts every requested feature set from a single file, decoding it only once
+    :return: (results, error): a (features, error) pair for each extractor, or the error raised while decoding
+    """
+    try:
+        analysis = AudioAnalysis.from_file(filepath)
+    except Exception as e:
+        return None, e
+    return extract_analysis_features(extractors, analysis), None
+
+
+def extract_dataset_features(
+        extractors,
+        workers: int = 1,
+        store: FeatureStore | None = None,
+) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """
+    Extracts several feature sets from every file in the data folder in a single sweep
+    :param extractors: FeatureExtractor subclasses to extract with
+    :param workers: Number of worker processes to extract with, -1 uses every core
+    :param store: Per-file feature store. Only files without stored features are extracted,
+                  and entries of files no longer in the data folder are pruned
+    :return: Mapping of FEATURE_NAME to (X, y), ordered by label folder then filename
+    """
+    extractors = list(extractors)
+    files = _list_dataset_files()
+
+    # file_features[i][j] holds the features of the i-th file for the j-th extractor
+    file_features = [[None] * len(extractors) for _ in files]
+    content_hashes = []
+    if store is not None:
+        for i, (filepath, _) in enumerate(files):
+            content_hash = store.file_hash(filepath)
+            content_hashes.append(content_hash)
+            for j, extractor in enumerate(extractors):
+                file_features[i][j] = store.get(extractor, content_hash)
+
+    pending = [
+        (i, [j for j in range(len(extractors)) if file_features[i][j] is None])
+        for i in range(len(files))
+    ]
+    pending = [(i, missing) for i, missing in pending if missing]
+
+    jobs = ((files[i][0], [extractors[j] for j in missing]) for i, missing in pending)
+    if workers == 1:
+        results = (_extract_file_safe(file_extractors, filepath) for filepath, file_extractors in jobs)
+    else:
+        parallel = Parallel(n_jobs=workers, batch_size=EXTRACTION_CHUNK_SIZE, return_as="generator")
+        # Workers send back the timings of their files along with the features
+        results = map(merge_worker_metrics, parallel(
+            delayed(call_with_metrics)(_extract_file_safe, file_extractors, filepath)
+            for filepath, file_extractors in jobs
+        ))
+    feature_names = ", ".join(extractor.FEATURE_NAME for extractor in extractors)
+    results = tqdm(results, total=len(pending), desc=f"Extracting {feature_names}")
+
+    for (i, missing), (file_results, error) in zip(pending, results):
+        filepath = files[i][0]
+        if error is not None:
+            print(f"Unable to process file '{filepath}': {error}")
+            count("extraction.failed_files")
+            continue
+        count("extraction.files")
+
+        for j, (features, error) in zip(missing, file_results):
+            extractor = extractors[j]
+            if error is not None:
+                print(f"Unable to process file '{filepath}' for {extractor.FEATURE_NAME}: {error}")
+                count(f"extraction.errors.{extractor.FEATURE_NAME}")
+            elif features is not None:
+                file_features[i][j] = features
+                if store is not None:
+                    store.put(extractor, content_hashes[i], features)
+
+    if store is not None:
+        for extractor in extractors:
+            store.prune(extractor, content_hashes)
+        store.save_index()
+        print(store.report())
+
+    feature_sets = {}
+    for j, extractor in enumerate(extractors):
+        X = [file_features[i][j] for i in range(len(files)) if file_features[i][j] is not None]
+        y = [files[i][1] for i in range(len(files)) if file_features[i][j] is not None]
+        feature_sets[extractor.FEATURE_NAME] = (np.array(X), np.array(y))
+    return feature_sets
 
 
 class FeatureExtractor(ABC):
     FEATURE_NAME: str = "base"
-    FEATURE_CACHE_PATH: Path
-    SCALER_CACHE_PATH: Path
+    # Bump whenever the extracted features change, invalidating every stored entry of the extractor
+    FEATURE_VERSION: int = 1
+    # Extractors that do not need the audio of the songs are not part of the sweep over the audio files
+    REQUIRES_AUDIO: bool = True
+    FEATURE_CACHE_STEM: Path
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         if cls.FEATURE_NAME == "base":
             raise TypeError(f"{cls.__name__} must define FEATURE_NAME")
 
-        cls.FEATURE_CACHE_PATH = paths.CACHE_DIR / f"{cls.FEATURE_NAME}-features.npz"
-        cls.SCALER_CACHE_PATH = paths.CACHE_DIR / f"{cls.FEATURE_NAME}-scaler.pkl"
+        cls.FEATURE_CACHE_STEM = paths.CACHE_DIR / f"{cls.FEATURE_NAME}-features"
+
+
+    @classmethod
+    def feature_params(cls) -> dict:
+        """Parameters that the extracted features depend on, part of the feature store key"""
+        return {
+            "sample_rate": c.SAMPLE_RATE,
+            "num_chords": c.NUM_CHORDS,
+            "chord_length": c.CHORD_LENGTH,
+        }
 
 
     @classmethod
     @abstractmethod
-    def extract_features_from_file(cls, filepath: Path):
+    def extract_features_from_analysis(cls, analysis: AudioAnalysis):
         raise NotImplementedError
 
 
     @classmethod
-    def extract_features_from_dataset(cls):
-        X = []
-        y = []
-
-        for path in paths.DATA_DIR.iterdir():
-            if not path.is_dir():
-                continue
-
-            label_str = path.name
-            label_num: int
-            try:
-                label_num = get_label_string_to_num(label_str)
-            except Exception as e:
-                print(f"Invalid label found within data folder: '{label_str}': {e}")
-                continue
-
-            for filepath in tqdm(list(path.iterdir()), desc=f"Extracting {cls.FEATURE_NAME} for {label_str:<15}"):
-                try:
-                    features = cls.extract_features_from_file(filepath)
-                    if features is not None:
-                        X.append(features)
-                        y.append(label_num)
-                except Exception as e:
-                    print(f"Unable to process file '{filepath}': {e}")
-
-        return np.array(X), np.array(y)
+    def extract_features_from_file(cls, filepath: Path):
+        return cls.extract_features_from_analysis(AudioAnalysis.from_file(filepath))
 
 
     @classmethod
-    def load_features(cls, regen_features: bool):
-        if not cls.FEATURE_CACHE_PATH.exists() or not cls.SCALER_CACHE_PATH.exists() or regen_features:
-            print("Extracting feature set")
-            X_unscaled, y = cls.extract_features_from_dataset()
+    def extract_features_from_dataset(cls, workers: int = 1, store: FeatureStore | None = None):
+        """
+        Extracts features from every file in the data folder
+        :param workers: Number of worker processes to extract with, -1 uses every core
+        :param store: Per-file feature store to reuse features of unchanged files from
+        :return: (X, y): features and labels of the dataset, ordered by label folder then filename
+        """
+        return extract_dataset_features([cls], workers, store)[cls.FEATURE_NAME]
 
-            scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X_unscaled)
 
-            paths.CACHE_DIR.mkdir(parents=True, exist_ok=True)
-            np.savez_compressed(cls.FEATURE_CACHE_PATH, X=X_scaled, y=y)
-            joblib.dump(scaler, cls.SCALER_CACHE_PATH)
+    @classmethod
+    def has_cached_features(cls, cache_format: str = DEFAULT_CACHE_FORMAT) -> bool:
+        return cache_path(cls.FEATURE_CACHE_STEM, cache_format).exists()
 
-            return scaler, X_scaled, y
 
-        print(f"Loading cached features from {cls.FEATURE_CACHE_PATH} and scaler from {cls.SCALER_CACHE_PATH}")
-        loaded_data = np.load(cls.FEATURE_CACHE_PATH)
-        X_loaded = np.array(loaded_data["X"])
-        y_loaded = np.array(loaded_data["y"])
-        scaler_loaded = joblib.load(cls.SCALER_CACHE_PATH)
+    @classmethod
+    def save_features(cls, X: np.ndarray, y: np.ndarray, cache_format: str = DEFAULT_CACHE_FORMAT):
+        """
+        Caches the unscaled features. Scaling is left to the models so that it is only ever
+        fitted on their training split, and the cache stays valid for any split or scaler
+        """
+        save_feature_matrix(cls.FEATURE_CACHE_STEM, X, y, cache_format)
+        return X, y
+
+
+    @classmethod
+    def load_cached_features(cls, cache_format: str = DEFAULT_CACHE_FORMAT):
+        """Loads the cached features, raw caches are memory-mapped and read lazily"""
+        print(f"Loading cached features from {cache_path(cls.FEATURE_CACHE_STEM, cache_format)}")
+        return load_feature_matrix(cls.FEATURE_CACHE_STEM, cache_format)
+
+
+    @classmethod
+    def load_features(cls, regen_features: bool, workers: int = 1, cache_format: str = DEFAULT_CACHE_FORMAT):
+        """
+        Loads the unscaled features of the dataset, extracting them if they are not cached
+        :return: (X, y): features and labels of the dataset
+        """
+        if not cls.has_cached_features(cache_format) or regen_features:
+            print("Extracting feature set")
+            X, y = cls.extract_features_from_dataset(workers, FeatureStore())
+            return cls.save_features(X, y, cache_format)
 
-        return scaler_loaded, X_loaded, y_loaded
\ No newline at end of file
+        return cls.load_cached_features(cache_format)
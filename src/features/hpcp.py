@@ -1,49 +1,35 @@
 import numpy as np
-import librosa.feature
-import warnings
-from pathlib import Path
 
-import src.constants as c
+from src.features.analysis import AudioAnalysis
 from src.features.extractor import FeatureExtractor
-from src.features.utils import load_audio_file, get_chord_segments
+from src.features.tonnetz import project_tonnetz
 
 
-def extract_hpcp_features(signal):
-    with warnings.catch_warnings():
-        warnings.filterwarnings('ignore')
-        hpcp = librosa.feature.chroma_cqt(y=signal, sr=c.SAMPLE_RATE)
-    hpcp_mean = np.mean(hpcp, axis=1)
-    hpcp_std = np.std(hpcp, axis=1)
-    return np.concatenate((hpcp_mean, hpcp_std))
+def extract_hpcp_features(hpcp):
+    hpcp_mean = np.mean(hpcp, axis=-1)
+    hpcp_std = np.std(hpcp, axis=-1)
+    return np.concatenate((hpcp_mean, hpcp_std), axis=-1)
 
 
-def extract_hpcp_and_tonnetz_features(signal):
-    with warnings.catch_warnings():
-        warnings.filterwarnings('ignore')
-        hpcp = librosa.feature.chroma_cqt(y=signal, sr=c.SAMPLE_RATE)
-        tonnetz = librosa.feature.tonnetz(y=signal, sr=c.SAMPLE_RATE)
-    hpcp_mean = np.mean(hpcp, axis=1)
-    tonnetz_mean = np.mean(tonnetz, axis=1)
-    return np.concatenate((hpcp_mean, tonnetz_mean))
+def extract_hpcp_and_tonnetz_features(hpcp):
+    # The Tonnetz is projected from the HPCP chroma itself, which is computed once per chord segment
+    tonnetz = project_tonnetz(hpcp)
+    hpcp_mean = np.mean(hpcp, axis=-1)
+    tonnetz_mean = np.mean(tonnetz, axis=-1)
+    return np.concatenate((hpcp_mean, tonnetz_mean), axis=-1)
 
 
 class HPCPExtractor(FeatureExtractor):
     FEATURE_NAME = "hpcp"
 
     @classmethod
-    def extract_features_from_file(cls, filepath: Path):
-        signal = load_audio_file(filepath)
-        segments = get_chord_segments(signal)
-        features = np.array([extract_hpcp_features(seg) for seg in segments])
-        return features.flatten()
+    def extract_features_from_analysis(cls, analysis: AudioAnalysis):
+        return extract_hpcp_features(analysis.segment_chroma).flatten()
 
 
 class HPCPAndTonnetzExtractor(FeatureExtractor):
     FEATURE_NAME = "hpcp-tonnetz"
 
     @classmethod
-    def extract_features_from_file(cls, filepath: Path):
-        signal = load_audio_file(filepath)
-        segments = get_chord_segments(signal)
-        features = np.array([extract_hpcp_and_tonnetz_features(seg) for seg in segments])
-        return features.flatten()
\ No newline at end of file
+    def extract_features_from_analysis(cls, analysis: AudioAnalysis):
+        return extract_hpcp_and_tonnetz_features(analysis.segment_chroma).flatten()
\ No newline at end of file
@@ -1,3 +1,8 @@
+from pathlib import Path
+from typing import NamedTuple
+
+import src.paths as paths
+
 _string_to_num: dict[str, int] = {
     "diatonic": 0,
     "non-diatonic":   1,
@@ -16,4 +21,24 @@ def get_label_num_to_string(label: int) -> str:
     if label in _num_to_string:
         return _num_to_string[label]
     else:
-        raise ValueError(f"No label found, invalid label: {label}")
\ No newline at end of file
+        raise ValueError(f"No label found, invalid label: {label}")
+
+
+class DatasetLabel(NamedTuple):
+    is_diatonic: bool
+    label: int
+    data_dir: Path
+    manifest_path: Path
+
+
+def dataset_labels() -> list[DatasetLabel]:
+    """
+    Both labels of the dataset, diatonic songs first. This is the order the label folders sort in when extracting
+    from disk, and feature sets built from the info manifests or while streaming list their rows in it as well
+    """
+    return [
+        DatasetLabel(True, get_label_string_to_num(paths.DATA_DIATONIC_DIR.name),
+                     paths.DATA_DIATONIC_DIR, paths.INFO_DIATONIC_TXT),
+        DatasetLabel(False, get_label_string_to_num(paths.DATA_NON_DIATONIC_DIR.name),
+                     paths.DATA_NON_DIATONIC_DIR, paths.INFO_NON_DIATONIC_TXT),
+    ]
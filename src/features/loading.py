@@ -1,70 +1,95 @@
-import joblib
-import numpy as np
-from pathlib import Path
-from sklearn.preprocessing import StandardScaler
-
-import src.paths as paths
+import src.constants as c
+from src.features.cache_format import DEFAULT_CACHE_FORMAT
+from src.features.extractor import FeatureExtractor, extract_dataset_features
 from src.features.hpcp import HPCPExtractor, HPCPAndTonnetzExtractor
 from src.features.mfcc import GlobalMFCCExtractor, PerChordMFCCExtractor
+from src.features.store import FeatureStore
+from src.features.symbolic import SymbolicExtractor
 from src.features.tonnetz import GlobalTonnetzExtractor, PerChordTonnetzExtractor
 
 
-def _load_feature(
-        extract_fn,
-        feature_cache_path: Path,
-        scaler_cache_path: Path,
-        regen_features: bool,
-):
-    if not feature_cache_path.exists() or not scaler_cache_path.exists() or regen_features:
-        print("Extracting feature set")
-        X_unscaled, y = extract_fn(44100)
-
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X_unscaled)
-
-        paths.CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        np.savez_compressed(feature_cache_path, X=X_scaled, y=y)
-        joblib.dump(scaler, scaler_cache_path)
-
-        return scaler, X_scaled, y
+FEATURE_EXTRACTORS: dict[str, type[FeatureExtractor]] = {
+    extractor.FEATURE_NAME: extractor for extractor in [
+        GlobalMFCCExtractor, PerChordMFCCExtractor,
+        GlobalTonnetzExtractor, PerChordTonnetzExtractor,
+        HPCPExtractor, HPCPAndTonnetzExtractor,
+        SymbolicExtractor,
+    ]
+}
+FEATURE_TYPES: list[str] = list(FEATURE_EXTRACTORS.keys())
+if FEATURE_TYPES != c.FEATURE_TYPES:
+    raise RuntimeError(f"Feature extractors {FEATURE_TYPES} do not match the feature types {c.FEATURE_TYPES}")
 
-    print(f"Loading cached features from {feature_cache_path}")
-    loaded_data = np.load(feature_cache_path)
-    X_loaded = np.array(loaded_data["X"])
-    y_loaded = np.array(loaded_data["y"])
-    scaler_loaded = joblib.load(scaler_cache_path)
 
-    return scaler_loaded, X_loaded, y_loaded
+def load_mfcc_features(regen_features: bool, workers: int = 1, cache_format: str = DEFAULT_CACHE_FORMAT):
+    return GlobalMFCCExtractor.load_features(regen_features, workers, cache_format)
 
 
-def load_mfcc_features(regen_features: bool):
-    return GlobalMFCCExtractor.load_features(regen_features)
+def load_per_chord_mfcc(regen_features: bool, workers: int = 1, cache_format: str = DEFAULT_CACHE_FORMAT):
+    return PerChordMFCCExtractor.load_features(regen_features, workers, cache_format)
 
 
-def load_per_chord_mfcc(regen_features: bool):
-    return PerChordMFCCExtractor.load_features(regen_features)
+def load_global_tonnetz_features(regen_features: bool, workers: int = 1, cache_format: str = DEFAULT_CACHE_FORMAT):
+    return GlobalTonnetzExtractor.load_features(regen_features, workers, cache_format)
 
 
-def load_global_tonnetz_features(regen_features: bool):
-    return GlobalTonnetzExtractor.load_features(regen_features)
+def load_per_chord_tonnetz_features(regen_features: bool, workers: int = 1, cache_format: str = DEFAULT_CACHE_FORMAT):
+    return PerChordTonnetzExtractor.load_features(regen_features, workers, cache_format)
 
 
-def load_per_chord_tonnetz_features(regen_features: bool):
-    return PerChordTonnetzExtractor.load_features(regen_features)
-
-
-def load_features(mode: str, regen_features: bool):
+def load_features(mode: str, regen_features: bool, workers: int = 1, cache_format: str = DEFAULT_CACHE_FORMAT):
     if mode == "global-mfcc":
-        return load_mfcc_features(regen_features)
+        return load_mfcc_features(regen_features, workers, cache_format)
     elif mode == "per-chord-mfcc":
-        return load_per_chord_mfcc(regen_features)
+        return load_per_chord_mfcc(regen_features, workers, cache_format)
     elif mode == "global-tonnetz":
-        return load_global_tonnetz_features(regen_features)
+        return load_global_tonnetz_features(regen_features, workers, cache_format)
     elif mode == "per-chord-tonnetz":
-        return load_per_chord_tonnetz_features(regen_features)
+        return load_per_chord_tonnetz_features(regen_features, workers, cache_format)
     elif mode == "hpcp":
-        return HPCPExtractor.load_features(regen_features)
+        return HPCPExtractor.load_features(regen_features, workers, cache_format)
     elif mode == "hpcp-tonnetz":
-        return HPCPAndTonnetzExtractor.load_features(regen_features)
+        return HPCPAndTonnetzExtractor.load_features(regen_features, workers, cache_format)
+    elif mode == "symbolic":
+        return SymbolicExtractor.load_features(regen_features, workers, cache_format)
     else:
         raise ValueError(f"Invalid feature mode: {mode}")
+
+
+def load_feature_sets(
+        modes: list[str],
+        regen_features: bool,
+        workers: int = 1,
+        cache_format: str = DEFAULT_CACHE_FORMAT,
+):
+    """
+    Loads several feature sets at once. Every feature set that is not cached is extracted
+    in a single sweep over the dataset, so each file is only decoded once. Files whose
+    features are already in the per-file feature store are not decoded at all
+    :param modes: Feature types to load
+    :param regen_features: Rebuild every requested feature set from the dataset even if it is cached
+    :param workers: Number of worker processes to extract with, -1 uses every core
+    :param cache_format: Format of the feature set caches, one of CACHE_FORMATS
+    :return: Mapping of feature type to the unscaled (X, y)
+    """
+    for mode in modes:
+        if mode not in FEATURE_EXTRACTORS:
+            raise ValueError(f"Invalid feature mode: {mode}")
+    extractors = [FEATURE_EXTRACTORS[mode] for mode in modes]
+
+    to_extract = [extractor for extractor in extractors if regen_features or not extractor.has_cached_features(cache_format)]
+    extracted = {}
+    audio_extractors = [extractor for extractor in to_extract if extractor.REQUIRES_AUDIO]
+    if audio_extractors:
+        print(f"Extracting feature sets: {', '.join(extractor.FEATURE_NAME for extractor in audio_extractors)}")
+        for name, (X, y) in extract_dataset_features(audio_extractors, workers, FeatureStore()).items():
+            extracted[name] = FEATURE_EXTRACTORS[name].save_features(X, y, cache_format)
+    for extractor in to_extract:
+        if not extractor.REQUIRES_AUDIO:
+            X, y = extractor.extract_features_from_dataset(workers)
+            extracted[extractor.FEATURE_NAME] = extractor.save_features(X, y, cache_format)
+
+    return {
+        mode: extracted[mode] if mode in extracted else FEATURE_EXTRACTORS[mode].load_cached_features(cache_format)
+        for mode in modes
+    }
@@ -1,10 +1,10 @@
 import librosa.feature
 import numpy as np
-from pathlib import Path
 
 import src.constants as c
+from src.features.analysis import AudioAnalysis
 from src.features.extractor import FeatureExtractor
-from src.features.utils import load_audio_file, get_chord_segments
+from src.instrumentation import timed
 
 NUM_MFCCS = 13
 NUM_MFCC_STATS = 2
@@ -34,11 +34,12 @@ def mfcc_feature_index(mfcc_index, chord_index, stat_index):
     )
 
 
-def extract_mfcc_features(signal):
-    mfcc = librosa.feature.mfcc(y=signal, sr=c.SAMPLE_RATE, n_mfcc=NUM_MFCCS)
-    mean = np.mean(mfcc, axis=1)
-    std = np.std(mfcc, axis=1)
-    return np.concatenate((mean, std))
+def extract_mfcc_features(mel_db):
+    with timed("librosa.mfcc"):
+        mfcc = librosa.feature.mfcc(S=mel_db, sr=c.SAMPLE_RATE, n_mfcc=NUM_MFCCS)
+    mean = np.mean(mfcc, axis=-1)
+    std = np.std(mfcc, axis=-1)
+    return np.concatenate((mean, std), axis=-1)
 
 
 class GlobalMFCCExtractor(FeatureExtractor):
@@ -46,9 +47,8 @@ class GlobalMFCCExtractor(FeatureExtractor):
 
 
     @classmethod
-    def extract_features_from_file(cls, filepath: Path):
-        signal = load_audio_file(filepath)
-        return extract_mfcc_features(signal)
+    def extract_features_from_analysis(cls, analysis: AudioAnalysis):
+        return extract_mfcc_features(analysis.mel_db)
 
 
 class PerChordMFCCExtractor(FeatureExtractor):
@@ -56,8 +56,5 @@ class PerChordMFCCExtractor(FeatureExtractor):
 
 
     @classmethod
-    def extract_features_from_file(cls, filepath: Path):
-        signal = load_audio_file(filepath)
-        segments = get_chord_segments(signal)
-        features = np.array([extract_mfcc_features(seg) for seg in segments])
-        return features.flatten()
\ No newline at end of file
+    def extract_features_from_analysis(cls, analysis: AudioAnalysis):
+        return extract_mfcc_features(analysis.segment_mel_db).flatten()
\ No newline at end of file
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import numpy as np
+from pathlib import Path
+
+import src.paths as paths
+from src.files import atomic_write, hash_file
+from src.instrumentation import count, timed
+
+class FeatureStore:
+    """
+    Per-file feature cache. Every entry is keyed by the content hash of the audio file together with
+    the name, version and parameters of the extractor that produced it, so an entry can never be
+    reused for a file whose contents or extraction settings changed.
+
+    Hashing a file is skipped when its size and modification time match the hash index from the last run.
+    """
+
+    def __init__(self, root: Path = paths.FEATURE_STORE_DIR):
+        self.root = root
+        self.index_path = root / "index.json"
+        # Loaded on first use, so stores that never hash files stay cheap to create and to send to workers
+        self._index: dict[str, dict] | None = None
+        self._used_index_keys: set[str] = set()
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+        self.pruned: dict[str, int] = {}
+
+
+    def _load_index(self) -> dict[str, dict]:
+        if self._index is None:
+            self._index = {}
+            if self.index_path.exists():
+                with self.index_path.open() as f:
+                    self._index = json.load(f)
+        return self._index
+
+
+    @timed("store.hash")
+    def file_hash(self, filepath: Path) -> str:
+        self._load_index()
+        index_key = str(filepath.resolve())
+        stat = filepath.stat()
+        self._used_index_keys.add(index_key)
+
+        entry = self._index.get(index_key)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["hash"]
+
+        content_hash = hash_file(filepath)
+        self._index[index_key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": content_hash}
+        return content_hash
+
+
+    def save_index(self):
+        """Saves the hash index, dropping files that were not seen since the store was opened"""
+        self._index = {key: entry for key, entry in self._load_index().items() if key in self._used_index_keys}
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.index_path.open("w") as f:
+            json.dump(self._index, f)
+
+
+    @staticmethod
+    def entry_key(extractor, content_hash: str) -> str:
+        identity = json.dumps({
+            "feature": extractor.FEATURE_NAME,
+            "version": extractor.FEATURE_VERSION,
+            "params": extractor.feature_params(),
+            "content": content_hash,
+        }, sort_keys=True)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+
+    def _entry_path(self, extractor, content_hash: str) -> Path:
+        return self.root / extractor.FEATURE_NAME / f"{self.entry_key(extractor, content_hash)}.npy"
+
+
+    @timed("store.get")
+    def get(self, extractor, content_hash: str) -> np.ndarray | None:
+        """Returns the stored features, counting the lookup as a hit or a miss"""
+        name = extractor.FEATURE_NAME
+        entry_path = self._entry_path(extractor, content_hash)
+        if entry_path.exists():
+            self.hits[name] = self.hits.get(name, 0) + 1
+            count("store.hits")
+            return np.load(entry_path)
+
+        self.misses[name] = self.misses.get(name, 0) + 1
+        count("store.misses")
+        return None
+
+
+    @timed("store.put")
+    def put(self, extractor, content_hash: str, features: np.ndarray):
+        with atomic_write(self._entry_path(extractor, content_hash)) as f:
+            np.save(f, features)
+
+
+    def prune(self, extractor, content_hashes) -> int:
+        """
+        Deletes every entry of the extractor that does not belong to one of the given files
+        :return: Number of entries deleted
+        """
+        feature_dir = self.root / extractor.FEATURE_NAME
+        if not feature_dir.exists():
+            return 0
+
+        keep = {f"{self.entry_key(extractor, content_hash)}.npy" for content_hash in content_hashes}
+        removed = 0
+        for entry_path in feature_dir.iterdir():
+            if entry_path.name not in keep:
+                entry_path.unlink()
+                removed += 1
+
+        self.pruned[extractor.FEATURE_NAME] = self.pruned.get(extractor.FEATURE_NAME, 0) + removed
+        return removed
+
+
+    def report(self) -> str:
+        lines = []
+        for name in sorted(set(self.hits) | set(self.misses) | set(self.pruned)):
+            hits = self.hits.get(name, 0)
+            misses = self.misses.get(name, 0)
+            total = hits + misses
+            hit_rate = hits / total * 100 if total else 0.0
+            lines.append(
+                f"Feature store {name:<18} {hits:>7} hits {misses:>7} misses "
+                f"({hit_rate:5.1f}% reused) {self.pruned.get(name, 0):>7} pruned"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,108 @@
+import numpy as np
+from pathlib import Path
+
+import src.constants as c
+from src.features.analysis import AudioAnalysis
+from src.features.extractor import FeatureExtractor
+from src.features.labels import dataset_labels
+from src.features.tonnetz import NUM_PITCH_CLASSES, project_tonnetz
+from src.music.song import CHORD_BEATS, VOLUME, Note, Song, progression_notes
+
+
+def _read_manifest(manifest_path: Path) -> list[tuple[str, list[str]]]:
+    """
+    Reads the songs of an info manifest, written by Song.string_info in the order of their filenames
+    :return: (key, progression) of every song
+    """
+    songs = []
+    with manifest_path.open() as manifest:
+        for line in manifest:
+            fields = line.split()
+            if len(fields) < c.NUM_CHORDS + 2:
+                continue
+            # Preset names may contain spaces, so the fields are read from the end: key, "major", numerals
+            songs.append((fields[-c.NUM_CHORDS - 2], fields[-c.NUM_CHORDS:]))
+    return songs
+
+
+def _read_midi_notes(filepath: Path) -> list[Note]:
+    """Notes of a MIDI file, with times and durations in beats"""
+    # music21 is slow to import and only needed to read MIDI files
+    import music21
+
+    notes = []
+    for element in music21.converter.parse(filepath).flatten().notes:
+        for pitch in element.pitches:
+            notes.append(Note(0, pitch.midi, float(element.offset), float(element.quarterLength), VOLUME))
+    return notes
+
+
+def extract_symbolic_features(notes: list[Note]) -> np.ndarray:
+    """
+    Pitch class profile and Tonnetz coordinates of every chord, from the notes sounding in its beats.
+    Profiles are normalized to a maximum of 1 like the CQT chroma, so the features line up with hpcp-tonnetz
+    :return: Array of shape (NUM_CHORDS * 18,), the profile and the Tonnetz coordinates of every chord in turn
+    """
+    pcp = np.zeros((c.NUM_CHORDS, NUM_PITCH_CLASSES))
+    for note in notes:
+        chord = int(note.time // CHORD_BEATS)
+        if 0 <= chord < c.NUM_CHORDS:
+            pcp[chord, note.pitch % NUM_PITCH_CLASSES] += 1
+
+    pcp /= np.maximum(pcp.max(axis=1, keepdims=True), 1)
+    tonnetz = project_tonnetz(pcp.T).T
+    return np.concatenate((pcp, tonnetz), axis=1).flatten()
+
+
+class SymbolicExtractor(FeatureExtractor):
+    """
+    Features of the notes of a song rather than of its audio. Songs are featurized straight from their progression
+    and key, so no song has to be synthesized or analyzed. It serves as a baseline the audio features can be held to
+    """
+    FEATURE_NAME = "symbolic"
+    REQUIRES_AUDIO = False
+
+
+    @classmethod
+    def feature_params(cls) -> dict:
+        return {
+            "num_chords": c.NUM_CHORDS,
+            "chord_beats": CHORD_BEATS,
+        }
+
+
+    @classmethod
+    def extract_features_from_analysis(cls, analysis: AudioAnalysis):
+        raise ValueError("Symbolic features are extracted from songs or MIDI files, not from audio")
+
+
+    @classmethod
+    def extract_features_from_song(cls, song: Song) -> np.ndarray:
+        return extract_symbolic_features(song.notes())
+
+
+    @classmethod
+    def extract_features_from_file(cls, filepath: Path) -> np.ndarray:
+        filepath = Path(filepath)
+        if filepath.suffix.lower() not in (".mid", ".midi"):
+            raise ValueError(f"Symbolic features are extracted from MIDI files, not from '{filepath.suffix}' files")
+        return extract_symbolic_features(_read_midi_notes(filepath))
+
+
+    @classmethod
+    def extract_features_from_dataset(cls, workers: int = 1, store=None):
+        """
+        Extracts features from the info manifests of the dataset, which list the key and progression of every song.
+        Neither the audio files nor the feature store are used, streamed datasets are featurized the same way
+        :return: (X, y): features and labels of the dataset, ordered by label then song index
+        """
+        X, y = [], []
+        for dataset_label in dataset_labels():
+            if not dataset_label.manifest_path.exists():
+                print(f"No info manifest found at '{dataset_label.manifest_path}', generate the songs first")
+                continue
+
+            for key, progression in _read_manifest(dataset_label.manifest_path):
+                X.append(extract_symbolic_features(progression_notes(progression, key)))
+                y.append(dataset_label.label)
+        return np.array(X), np.array(y)
@@ -1,15 +1,47 @@
-import librosa.feature
 import numpy as np
-from pathlib import Path
 
-import src.constants as c
+from src.features.analysis import AudioAnalysis
 from src.features.extractor import FeatureExtractor
-from src.features.utils import load_audio_file, get_chord_segments
 
 
 NUM_TONNETZ_AXIS = 3
 NUM_TONNETZ_COEFFICIENTS = 6
 NUM_TONNETZ_STATS = 2
+NUM_PITCH_CLASSES = 12
+
+
+def _tonnetz_basis() -> np.ndarray:
+    """
+    Basis of the Tonnetz projection used by librosa.feature.tonnetz, of shape (6, 12). Every pair of rows holds the
+    sine and cosine of the pitch classes around the circle of fifths, minor thirds and major thirds in turn
+    """
+    pitch_classes = np.arange(NUM_PITCH_CLASSES)
+    scale = np.array([7 / 6, 7 / 6, 3 / 2, 3 / 2, 2 / 3, 2 / 3])
+    angles = np.multiply.outer(scale, pitch_classes)
+    # Even rows are shifted by a quarter turn, which turns their cosine into a sine
+    angles[::2] -= 0.5
+    radii = np.array([1, 1, 1, 1, 0.5, 0.5])
+    return radii[:, np.newaxis] * np.cos(np.pi * angles)
+
+
+TONNETZ_BASIS = _tonnetz_basis()
+
+
+def project_tonnetz(chroma: np.ndarray) -> np.ndarray:
+    """
+    Projects chroma onto the Tonnetz with a single matrix multiply, the same as librosa.feature.tonnetz(chroma=chroma).
+    Any number of leading dimensions is supported, so the chroma of every chord of every file can be projected at once
+    :param chroma: Array of shape (..., 12, frames)
+    :return: Array of shape (..., 6, frames)
+    """
+    chroma = np.asarray(chroma)
+    if chroma.dtype.kind != "f":
+        chroma = chroma.astype(np.float64)
+    # Every frame is normalized to sum to 1, frames without energy are left as they are like librosa does
+    norms = np.sum(np.abs(chroma), axis=-2, keepdims=True)
+    norms[norms < np.finfo(chroma.dtype).tiny] = 1
+    # The float64 basis promotes the result to float64, matching librosa
+    return np.matmul(TONNETZ_BASIS, chroma / norms)
 
 
 def get_tonnetz_axis_name(axis: int):
@@ -25,11 +57,11 @@ def get_tonnetz_axis_name(axis: int):
 
 
 
-def extract_tonnetz_features(signal):
-   tonnetz = librosa.feature.tonnetz(y=signal, sr=c.SAMPLE_RATE)
-   mean = np.mean(tonnetz, axis=1)
-   std = np.std(tonnetz, axis=1)
-   return np.concatenate((mean, std))
+def extract_tonnetz_features(chroma):
+   tonnetz = project_tonnetz(chroma)
+   mean = np.mean(tonnetz, axis=-1)
+   std = np.std(tonnetz, axis=-1)
+   return np.concatenate((mean, std), axis=-1)
 
 
 class GlobalTonnetzExtractor(FeatureExtractor):
@@ -37,18 +69,14 @@ class GlobalTonnetzExtractor(FeatureExtractor):
 
 
     @classmethod
-    def extract_features_from_file(cls, filepath: Path):
-        signal = load_audio_file(filepath)
-        return extract_tonnetz_features(signal)
+    def extract_features_from_analysis(cls, analysis: AudioAnalysis):
+        return extract_tonnetz_features(analysis.chroma)
 
 
 class PerChordTonnetzExtractor(FeatureExtractor):
-    FEATURE_NAME = "per-chord-mfcc"
+    FEATURE_NAME = "per-chord-tonnetz"
 
 
     @classmethod
-    def extract_features_from_file(cls, filepath: Path):
-        signal = load_audio_file(filepath)
-        segments = get_chord_segments(signal)
-        features = np.array([extract_tonnetz_features(seg) for seg in segments])
-        return features.flatten()
\ No newline at end of file
+    def extract_features_from_analysis(cls, analysis: AudioAnalysis):
+        return extract_tonnetz_features(analysis.segment_chroma).flatten()
\ No newline at end of file
@@ -1,16 +1,18 @@
 import librosa
 from pathlib import Path
-from sklearn.metrics import precision_score, recall_score
 
 import src.constants as c
+from src.instrumentation import timed
 
 
+@timed("audio.decode")
 def load_audio_file(filepath: Path):
     signal, sr = librosa.load(filepath, sr=c.SAMPLE_RATE)
     signal = signal[:c.SAMPLES_PER_WAVE]
     return signal
 
 
+@timed("audio.segment")
 def get_chord_segments(signal):
     if len(signal) < c.SAMPLES_PER_WAVE:
         raise ValueError(f"Signal too short: len of signal is {len(signal)}")
@@ -22,8 +24,12 @@ def get_chord_segments(signal):
     return segments
 
 
-def evaluate_precision_and_recall(model, X, y):
-    y_pred = model.predict(X)
-    precision = precision_score(y, y_pred)
-    recall = recall_score(y, y_pred)
-    return precision, recall
\ No newline at end of file
+@timed("audio.segment")
+def get_chord_segment_matrix(signal):
+    """
+    Splits the signal into one row per chord without copying it
+    :return: Array of shape (NUM_CHORDS, SAMPLES_PER_CHORD)
+    """
+    if len(signal) < c.SAMPLES_PER_WAVE:
+        raise ValueError(f"Signal too short: len of signal is {len(signal)}")
+    return signal[:c.SAMPLES_PER_WAVE].reshape(c.NUM_CHORDS, c.SAMPLES_PER_CHORD)
@@ -0,0 +1,52 @@
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Number of bytes read at a time while hashing a file
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(filepath: Path) -> str:
+    """:return: Hex SHA-256 digest of the contents of the file, read in chunks"""
+    digest = hashlib.sha256()
+    with filepath.open("rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "wb"):
+    """
+    Opens a unique temporary file next to path, which replaces path once the block completes.
+    Readers, other processes writing the same path included, only ever see a complete file. A block that
+    raises or is interrupted leaves path untouched and removes the temporary file, so an interrupted run
+    never leaves a truncated cache, entry or artifact behind
+    :param mode: Mode the temporary file is opened in, "wb" or "w"
+    :return: The opened temporary file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(mode, dir=path.parent, prefix=f"{path.name}.", suffix=".tmp",
+                                     delete=False) as f:
+        temp_path = Path(f.name)
+        try:
+            yield f
+        except BaseException:
+            f.close()
+            temp_path.unlink(missing_ok=True)
+            raise
+    temp_path.replace(path)
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """Writes data to path through a temporary file, see atomic_write"""
+    with atomic_write(path, "wb") as f:
+        f.write(data)
+
+
+def atomic_write_text(path: Path, text: str):
+    """Writes text to path through a temporary file, see atomic_write"""
+    with atomic_write(path, "w") as f:
+        f.write(text)
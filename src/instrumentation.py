@@ -0,0 +1,264 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.files import atomic_write_text
+
+METRICS_FORMATS = ["json", "prometheus"]
+# Upper bounds in seconds of the buckets every duration is counted in, longer durations fall in a last unbounded bucket
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+_PROMETHEUS_PREFIX = "secondary_dominants"
+# Number of functions listed in the text summary of a profile
+_PROFILE_SUMMARY_FUNCTIONS = 50
+
+
+class Histogram:
+    """Count, sum, extremes and bucket counts of the durations of a timed section"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        # Counts of every bucket of DURATION_BUCKETS followed by the unbounded bucket, not cumulative
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+
+    def merge(self, other: dict):
+        if not other["count"]:
+            return
+        self.count += other["count"]
+        self.total += other["sum"]
+        self.min = min(self.min, other["min"])
+        self.max = max(self.max, other["max"])
+        self.buckets = [count + other_count for count, other_count in zip(self.buckets, other["buckets"])]
+
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "buckets": list(self.buckets),
+        }
+
+
+class Metrics:
+    """
+    Thread-safe counters and duration histograms of a run. Tasks sent to workers record into their own copy,
+    which is sent back with their results and merged, see call_with_metrics
+    """
+
+    def __init__(self):
+        self.counters: dict[str, float] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(seconds)
+
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "durations": {name: self.histograms[name].to_dict() for name in sorted(self.histograms)},
+            }
+
+
+    def merge(self, snapshot: dict):
+        with self._lock:
+            for name, value in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, histogram in snapshot["durations"].items():
+                if name not in self.histograms:
+                    self.histograms[name] = Histogram()
+                self.histograms[name].merge(histogram)
+
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+_metrics = Metrics()
+# Metrics of the call_with_metrics call running in the current thread, if any
+_task_metrics = threading.local()
+
+
+def _current() -> Metrics:
+    return getattr(_task_metrics, "metrics", None) or _metrics
+
+
+def count(name: str, value: float = 1):
+    """Adds value to the counter of name"""
+    _current().count(name, value)
+
+
+def observe(name: str, seconds: float):
+    """Records a duration in the histogram of name"""
+    _current().observe(name, seconds)
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Records how long the block or the decorated function takes in the histogram of name, whether it raises or not.
+    Every call of a decorated function is timed on its own, so it can be used from several threads
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current().observe(name, time.perf_counter() - start)
+
+
+def snapshot() -> dict:
+    """:return: Counters and duration histograms recorded so far, as plain data"""
+    return _metrics.snapshot()
+
+
+def merge(metrics: dict):
+    """Adds a snapshot, e.g. the one of a worker process, to the metrics of this process"""
+    _metrics.merge(metrics)
+
+
+def reset():
+    _metrics.reset()
+
+
+def call_with_metrics(function, *args):
+    """
+    Calls function, typically in a worker process, and returns its result along with the metrics it recorded,
+    for the parent process to merge with merge_worker_metrics. The call records into metrics of its own, so
+    the metrics of the process running it are left untouched, even when a pool runs its tasks in the parent.
+    Picklable as long as function is
+    :return: (result, snapshot)
+    """
+    previous = getattr(_task_metrics, "metrics", None)
+    _task_metrics.metrics = Metrics()
+    try:
+        result = function(*args)
+        return result, _task_metrics.metrics.snapshot()
+    finally:
+        _task_metrics.metrics = previous
+
+
+def merge_worker_metrics(outcome: tuple):
+    """Merges the metrics returned by call_with_metrics into this process, returning the result of the call"""
+    result, metrics = outcome
+    merge(metrics)
+    return result
+
+
+def _prometheus_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def to_prometheus(metrics: dict) -> str:
+    """Formats a snapshot in the Prometheus text exposition format"""
+    durations = f"{_PROMETHEUS_PREFIX}_duration_seconds"
+    events = f"{_PROMETHEUS_PREFIX}_events_total"
+    lines = [
+        f"# HELP {durations} Time spent in every instrumented section of the run",
+        f"# TYPE {durations} histogram",
+    ]
+    for name, histogram in metrics["durations"].items():
+        section = f'section="{_prometheus_label(name)}"'
+        cumulative = 0
+        for bound, bucket_count in zip(DURATION_BUCKETS, histogram["buckets"]):
+            cumulative += bucket_count
+            lines.append(f'{durations}_bucket{{{section},le="{bound}"}} {cumulative}')
+        lines.append(f'{durations}_bucket{{{section},le="+Inf"}} {histogram["count"]}')
+        lines.append(f"{durations}_sum{{{section}}} {histogram['sum']}")
+        lines.append(f"{durations}_count{{{section}}} {histogram['count']}")
+
+    lines += [
+        f"# HELP {events} Number of events counted during the run",
+        f"# TYPE {events} counter",
+    ]
+    for name, value in metrics["counters"].items():
+        lines.append(f'{events}{{event="{_prometheus_label(name)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def metrics_format_of(path: Path) -> str:
+    """:return: prometheus for .prom and .txt files, json otherwise"""
+    return "prometheus" if Path(path).suffix in (".prom", ".txt") else "json"
+
+
+def export_metrics(path: Path, metrics_format: str | None = None) -> Path:
+    """
+    Writes the metrics recorded so far
+    :param metrics_format: One of METRICS_FORMATS, picked from the extension of path by default
+    """
+    metrics_format = metrics_format or metrics_format_of(path)
+    if metrics_format not in METRICS_FORMATS:
+        raise ValueError(f"Invalid metrics format {metrics_format}. Format must be one of {METRICS_FORMATS}")
+
+    metrics = snapshot()
+    text = to_prometheus(metrics) if metrics_format == "prometheus" else json.dumps(metrics, indent=2)
+    path = Path(path)
+    atomic_write_text(path, text)
+    return path
+
+
+def summary() -> str:
+    """Table of the timed sections, slowest in total first, followed by the counters"""
+    metrics = snapshot()
+    lines = [f"{'section':<28} {'count':>8} {'total s':>10} {'mean ms':>10} {'max ms':>10}"]
+    for name, histogram in sorted(metrics["durations"].items(), key=lambda item: item[1]["sum"], reverse=True):
+        lines.append(f"{name:<28} {histogram['count']:>8} {histogram['sum']:>10.3f} "
+                     f"{histogram['mean'] * 1000:>10.2f} {histogram['max'] * 1000:>10.2f}")
+    for name, value in metrics["counters"].items():
+        lines.append(f"{name:<28} {value:>8g}")
+    return "\n".join(lines)
+
+
+def run_profiled(output_path: Path, function, *args, **kwargs):
+    """
+    Runs function under cProfile. The statistics are written to output_path, readable with pstats or snakeviz,
+    along with a text summary of the slowest functions next to it. Only the calling thread is profiled,
+    worker processes and threads show up as the time spent waiting on them
+    :return: The result of function
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(output_path)
+        with output_path.with_suffix(".txt").open("w") as summary_file:
+            stats = pstats.Stats(profiler, stream=summary_file)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_PROFILE_SUMMARY_FUNCTIONS)
+        print(f"Wrote profile to {output_path}")
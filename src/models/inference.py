@@ -0,0 +1,46 @@
+import time
+import numpy as np
+from pathlib import Path
+from typing import NamedTuple
+
+from src.features.labels import get_label_num_to_string
+from src.features.loading import FEATURE_EXTRACTORS
+from src.models.persistence import ModelArtifact
+
+
+class Prediction(NamedTuple):
+    filepath: Path
+    label: str | None
+    error: str | None
+    extract_seconds: float
+
+
+def classify_files(artifact: ModelArtifact, filepaths: list[Path]) -> tuple[list[Prediction], float]:
+    """
+    Classifies wave files, or MIDI files for symbolic models, with a loaded model. Features are extracted file by file and classified in one batch
+    :return: (predictions, predict_seconds): a prediction for every file in order, and the time spent in the model
+    """
+    extractor = FEATURE_EXTRACTORS[artifact.feature_type]
+
+    features = []
+    extracted = []
+    for filepath in filepaths:
+        start = time.perf_counter()
+        try:
+            features.append(extractor.extract_features_from_file(filepath))
+            extracted.append((filepath, None, time.perf_counter() - start))
+        except Exception as e:
+            extracted.append((filepath, str(e) or type(e).__name__, time.perf_counter() - start))
+
+    labels = iter([])
+    predict_seconds = 0.0
+    if features:
+        start = time.perf_counter()
+        labels = iter(artifact.estimator.predict(np.array(features)))
+        predict_seconds = time.perf_counter() - start
+
+    predictions = [
+        Prediction(filepath, None if error is not None else get_label_num_to_string(int(next(labels))), error, seconds)
+        for filepath, error, seconds in extracted
+    ]
+    return predictions, predict_seconds
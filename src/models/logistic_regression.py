@@ -1,39 +1,16 @@
 import matplotlib.pyplot as plt
 import numpy as np
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
 
-from src.features.utils import evaluate_precision_and_recall
+from src.constants import DEFAULT_TRAINING_SEED
+from src.models.search import logistic_regression_c_path
+from src.models.training import DEFAULT_LEARNING_CURVE_SIZES, TrainingSplits
 from src.visualization.learning_curve import plot_learning_curve
+from src.visualization.report import Report
 from src.visualization.roc import plot_roc_curve
-from src.utils import split_dataset
 
 
-def tune_hyperparameters(X_train, y_train, X_val, y_val):
-    C_values = np.logspace(-4, 4, 10)
-
-    train_scores = []
-    val_scores = []
-
-    for C in C_values:
-        model = LogisticRegression(C=C, max_iter=1000, random_state=42)
-        model.fit(X_train, y_train)
-
-        train_pred = model.predict(X_train)
-        val_pred = model.predict(X_val)
-
-        train_scores.append(accuracy_score(y_train, train_pred))
-        val_scores.append(accuracy_score(y_val, val_pred))
-
-    # Find best C value based on validation accuracy
-    best_idx = np.argmax(val_scores)
-    best_C = C_values[best_idx]
-    best_val_acc = val_scores[best_idx]
-
-    print(f"Best C value: {best_C:.4f}")
-    print(f"Best validation accuracy: {best_val_acc:.4f}")
-
-    # Plot results
+def plot_c_tuning(C_values, train_scores, val_scores, best_C):
     plt.figure(figsize=(10, 6))
     plt.semilogx(C_values, train_scores, label='Training Accuracy', marker='o', markersize=3)
     plt.semilogx(C_values, val_scores, label='Validation Accuracy', marker='o', markersize=3)
@@ -44,31 +21,64 @@ def tune_hyperparameters(X_train, y_train, X_val, y_val):
     plt.legend()
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.show()
 
-    # Train final model with best C
-    best_model = LogisticRegression(C=best_C, max_iter=1000, random_state=42)
-    best_model.fit(X_train, y_train)
 
-    return best_model
+def tune_hyperparameters(X_train, y_train, X_val, y_val, report: Report | None = None):
+    """
+    :param report: Report the accuracy against C plot is added to, None skips it
+    """
+    C_values = np.logspace(-4, 4, 10)
 
+    result, train_scores, models = logistic_regression_c_path(
+        LogisticRegression(max_iter=1000, random_state=42), C_values, X_train, y_train, X_val, y_val)
+    print(result.report())
+    val_scores = result.scores
 
-def train_logistic_regression(X: np.ndarray, y: np.ndarray):
-    X_train, y_train, X_val, y_val, X_test, y_test = split_dataset(X, y)
+    # Find best C value based on validation accuracy
+    best_idx = np.argmax(val_scores)
+    best_C = C_values[best_idx]
+    best_val_acc = val_scores[best_idx]
 
-    model = tune_hyperparameters(X_train, y_train, X_val, y_val)
-    plot_learning_curve(model, X, y)
-    plot_roc_curve(model, X, y)
+    print(f"Best C value: {best_C:.4f}")
+    print(f"Best validation accuracy: {best_val_acc:.4f}")
 
-    train_acc = model.score(X_train, y_train)
-    val_acc = model.score(X_val, y_val)
-    test_acc = model.score(X_test, y_test)
+    if report is not None:
+        report.add(plot_c_tuning, "logistic_regression_c_tuning.png", C_values, train_scores, val_scores, best_C)
+
+    # The model of the best C was already fitted on the training split along the path
+    return models[best_idx]
+
+
+def train_logistic_regression(
+        X: np.ndarray,
+        y: np.ndarray,
+        learning_curve_sizes: int = DEFAULT_LEARNING_CURVE_SIZES,
+        report: Report | None = None,
+        seed: int = DEFAULT_TRAINING_SEED,
+):
+    """
+    :param learning_curve_sizes: Number of training set sizes of the learning curve, 0 skips it
+    :param report: Report the C tuning, learning curve and ROC curve plots are added to, None skips them
+    :param seed: Seed of the dataset split
+    """
+    splits = TrainingSplits(X, y, seed)
+
+    model = tune_hyperparameters(splits.X_train, splits.y_train, splits.X_val, splits.y_val, report)
+    if report is not None:
+        if learning_curve_sizes:
+            report.add(plot_learning_curve, "logistic_regression_learning_curve.png",
+                       model, np.asarray(X), np.asarray(y), learning_curve_sizes)
+        report.add(plot_roc_curve, "logistic_regression_roc.png", splits.y_test, splits.scores(model, "test"))
+
+    train_acc = splits.accuracy(model, "train")
+    val_acc = splits.accuracy(model, "val")
+    test_acc = splits.accuracy(model, "test")
 
     print(f"Train accuracy: {train_acc * 100:.2f}%")
     print(f"Val accuracy:   {val_acc * 100:.2f}%")
     print(f"Test accuracy:  {test_acc * 100:.2f}%")
 
-    precision, recall = evaluate_precision_and_recall(model, X_test, y_test)
+    precision, recall = splits.precision_and_recall(model)
     print(f"Precision: {precision:.3f}")
     print(f"Recall:    {recall:.3f}")
 
@@ -0,0 +1,86 @@
+import joblib
+import sklearn
+from pathlib import Path
+from typing import NamedTuple
+
+import src.paths as paths
+from src.features.loading import FEATURE_EXTRACTORS
+from src.files import atomic_write
+
+# Bump when the layout of saved artifacts changes, older artifacts are then refused instead of misread
+ARTIFACT_VERSION = 1
+
+
+class ModelArtifact(NamedTuple):
+    """
+    Fitted model together with everything needed to classify new recordings with it.
+    The estimator is the whole pipeline, so the scaler fitted on the training split is saved with it
+    """
+    estimator: object
+    model_type: str
+    feature_type: str
+    feature_version: int
+    feature_params: dict
+    sklearn_version: str
+
+
+def get_model_path(model_type: str, feature_type: str) -> Path:
+    return paths.MODELS_DIR / f"{model_type}-{feature_type}.joblib"
+
+
+def save_model(estimator, model_type: str, feature_type: str, path: Path | None = None) -> Path:
+    """
+    Saves a fitted model along with the version and parameters of the features it was trained on
+    :param estimator: Fitted pipeline of the scaler and the model
+    :param path: Path of the artifact, defaults to models/<model_type>-<feature_type>.joblib
+    :return: Path of the saved artifact
+    """
+    extractor = FEATURE_EXTRACTORS[feature_type]
+    path = path if path is not None else get_model_path(model_type, feature_type)
+
+    artifact = {
+        "artifact_version": ARTIFACT_VERSION,
+        "estimator": estimator,
+        "model_type": model_type,
+        "feature_type": feature_type,
+        "feature_version": extractor.FEATURE_VERSION,
+        "feature_params": extractor.feature_params(),
+        "sklearn_version": sklearn.__version__,
+    }
+    with atomic_write(path) as f:
+        joblib.dump(artifact, f)
+    return path
+
+
+def load_model(path: Path) -> ModelArtifact:
+    """
+    Loads a saved model, refusing artifacts whose layout or features do not match the current code
+    :raises ValueError: If the artifact was saved by an incompatible version
+    """
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found. Train a model with main.py first")
+
+    artifact = joblib.load(path)
+    if not isinstance(artifact, dict) or artifact.get("artifact_version") != ARTIFACT_VERSION:
+        raise ValueError(f"{path} was saved by an incompatible version, train the model again")
+
+    feature_type = artifact["feature_type"]
+    extractor = FEATURE_EXTRACTORS.get(feature_type)
+    if extractor is None:
+        raise ValueError(f"{path} uses unknown feature type {feature_type}")
+    if artifact["feature_version"] != extractor.FEATURE_VERSION or artifact["feature_params"] != extractor.feature_params():
+        raise ValueError(f"{path} was trained on {feature_type} features that no longer match the extractor, "
+                         f"train the model again")
+
+    if artifact["sklearn_version"] != sklearn.__version__:
+        print(f"Warning: {path} was saved with scikit-learn {artifact['sklearn_version']}, "
+              f"running {sklearn.__version__}")
+
+    return ModelArtifact(
+        estimator=artifact["estimator"],
+        model_type=artifact["model_type"],
+        feature_type=feature_type,
+        feature_version=artifact["feature_version"],
+        feature_params=artifact["feature_params"],
+        sklearn_version=artifact["sklearn_version"],
+    )
@@ -0,0 +1,167 @@
+import copy
+import time
+import numpy as np
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401, enables HalvingGridSearchCV
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, PredefinedSplit
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.constants import DEFAULT_SEARCH_STRATEGY, DEFAULT_TRAINING_SEED, SEARCH_STRATEGIES
+from src.instrumentation import count, timed
+
+HALVING_FACTOR = 3
+# Below this many training samples the first halving rounds would fit on a handful of songs, the grid is used instead
+HALVING_MIN_TRAIN_SAMPLES = 500
+
+
+class SearchResult:
+    """Validation scores of every candidate of a search, along with how long the search took"""
+
+    def __init__(self, strategy: str, params: list[dict], scores: np.ndarray, best_params: dict, num_fits: int,
+                 elapsed_seconds: float, exhaustive_seconds: float):
+        self.strategy = strategy
+        self.params = params
+        self.scores = scores
+        # With successive halving, the best candidate of the last round, which was fitted on the most samples
+        self.best_params = best_params
+        self.num_fits = num_fits
+        self.elapsed_seconds = elapsed_seconds
+        # Estimated time of fitting every candidate on the whole training split from scratch, one after another
+        self.exhaustive_seconds = exhaustive_seconds
+
+
+    def report(self) -> str:
+        saved = self.exhaustive_seconds - self.elapsed_seconds
+        return (f"{self.strategy} search: {self.num_fits} fits in {self.elapsed_seconds:.2f}s, "
+                f"serial exhaustive grid {self.exhaustive_seconds:.2f}s, {saved:.2f}s saved")
+
+
+def _validation_split(X_train, y_train, X_val, y_val):
+    """Joins the splits, so a search can score its candidates on the fixed validation split"""
+    X = np.concatenate([X_train, X_val])
+    y = np.concatenate([y_train, y_val])
+    test_fold = np.concatenate([np.full(len(y_train), -1), np.zeros(len(y_val), dtype=int)])
+    return X, y, PredefinedSplit(test_fold)
+
+
+def search_hyperparameters(
+    estimator,
+    param_grid: dict[str, list],
+    X_train, y_train, X_val, y_val,
+    strategy: str = DEFAULT_SEARCH_STRATEGY,
+    workers: int = 1,
+    seed: int = DEFAULT_TRAINING_SEED,
+) -> SearchResult:
+    """
+    Scores every combination of the parameter grid on the validation split, fitting candidates across cores
+    :param estimator: Estimator or pipeline the parameters of the grid belong to
+    :param strategy: One of SEARCH_STRATEGIES
+    :param workers: Number of candidates fitted at once, -1 uses every core
+    :param seed: Seed of the subsets successive halving fits candidates on
+    """
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Invalid search strategy {strategy}. Strategy must be one of {SEARCH_STRATEGIES}")
+    if strategy == "halving" and len(y_train) < HALVING_MIN_TRAIN_SAMPLES:
+        print(f"Only {len(y_train)} training samples, searching the whole grid instead of halving")
+        strategy = "grid"
+
+    X, y, split = _validation_split(X_train, y_train, X_val, y_val)
+    if strategy == "halving":
+        search = HalvingGridSearchCV(estimator, param_grid, factor=HALVING_FACTOR, cv=split, refit=False,
+                                     n_jobs=workers, random_state=seed)
+    else:
+        search = GridSearchCV(estimator, param_grid, cv=split, refit=False, n_jobs=workers)
+
+    start = time.perf_counter()
+    with timed(f"model.search.{strategy}"):
+        search.fit(X, y)
+    elapsed_seconds = time.perf_counter() - start
+
+    results = search.cv_results_
+    cost = results["mean_fit_time"] + results["mean_score_time"]
+    if strategy == "halving":
+        # Every candidate appears once per round it survived, its score is the one of its last, largest round
+        last_round = {}
+        for i, params in enumerate(results["params"]):
+            last_round[tuple(sorted(params.items()))] = i
+        rows = list(last_round.values())
+        full_rows = results["n_resources"] == results["n_resources"].max()
+        exhaustive_seconds = len(rows) * float(np.mean(cost[full_rows]))
+    else:
+        rows = list(range(len(results["params"])))
+        exhaustive_seconds = float(np.sum(cost))
+    count("model.search.fits", len(results["params"]))
+
+    return SearchResult(
+        strategy=strategy,
+        params=[results["params"][i] for i in rows],
+        scores=np.array([results["mean_test_score"][i] for i in rows]),
+        best_params=search.best_params_,
+        num_fits=len(results["params"]),
+        elapsed_seconds=elapsed_seconds,
+        exhaustive_seconds=exhaustive_seconds,
+    )
+
+
+def grid_scores(result: SearchResult, first: str, first_values, second: str, second_values) -> np.ndarray:
+    """Validation scores of a two parameter search as a (len(first_values), len(second_values)) matrix"""
+    scores = np.full((len(first_values), len(second_values)), np.nan)
+    for params, score in zip(result.params, result.scores):
+        scores[list(first_values).index(params[first]), list(second_values).index(params[second])] = score
+    return scores
+
+
+def logistic_regression_c_path(model: LogisticRegression, C_values, X_train, y_train, X_val, y_val):
+    """
+    Fits the model for every C in increasing order, starting every fit from the coefficients of the previous one.
+    Neighbouring C values have close solutions, so each warm-started fit converges in a few iterations.
+    Every fit starts from the previous one, so the path runs on a single core whatever the number of workers.
+    The first fit of the path starts cold, and one more cold fit is timed at the largest C, the slowest to
+    converge, to estimate the time of fitting every C from scratch
+    :return: (result, train_scores, models), a SearchResult over C along with the training scores and the fitted
+             pipelines of the scaler and the model for every C, in the order of C_values
+    """
+    scaler = StandardScaler().fit(X_train)
+    X_train_scaled = scaler.transform(X_train)
+    X_val_scaled = scaler.transform(X_val)
+
+    path_model = clone(model).set_params(warm_start=True)
+    train_scores = np.zeros(len(C_values))
+    val_scores = np.zeros(len(C_values))
+    models = [None] * len(C_values)
+
+    fit_seconds = np.zeros(len(C_values))
+
+    start = time.perf_counter()
+    for i in np.argsort(C_values):
+        path_model.set_params(C=C_values[i])
+        fit_start = time.perf_counter()
+        with timed("model.fit.logistic-regression"):
+            path_model.fit(X_train_scaled, y_train)
+        fit_seconds[i] = time.perf_counter() - fit_start
+        train_scores[i] = accuracy_score(y_train, path_model.predict(X_train_scaled))
+        val_scores[i] = accuracy_score(y_val, path_model.predict(X_val_scaled))
+        # Both are already fitted on the training split, so the pipeline can be used without fitting it again
+        models[i] = make_pipeline(scaler, copy.deepcopy(path_model).set_params(warm_start=False))
+    elapsed_seconds = time.perf_counter() - start
+
+    first, last = np.argmin(C_values), np.argmax(C_values)
+    cold_start = time.perf_counter()
+    clone(model).set_params(C=C_values[last]).fit(X_train_scaled, y_train)
+    cold_seconds = [fit_seconds[first], time.perf_counter() - cold_start]
+    count("model.search.fits", len(C_values))
+
+    best = int(np.argmax(val_scores))
+    result = SearchResult(
+        strategy="warm-start C path",
+        params=[{"C": C} for C in C_values],
+        scores=val_scores,
+        best_params={"C": C_values[best]},
+        num_fits=len(C_values),
+        elapsed_seconds=elapsed_seconds,
+        exhaustive_seconds=len(C_values) * float(np.mean(cold_seconds)),
+    )
+    return result, train_scores, models
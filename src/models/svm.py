@@ -1,25 +1,36 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 from sklearn.svm import SVC
 
-from src.features.utils import evaluate_precision_and_recall
+from src.constants import DEFAULT_TRAINING_SEED
+from src.instrumentation import timed
+from src.models.search import DEFAULT_SEARCH_STRATEGY, grid_scores, search_hyperparameters
+from src.models.training import DEFAULT_LEARNING_CURVE_SIZES, TrainingSplits
 from src.visualization.learning_curve import plot_learning_curve
+from src.visualization.report import Report
 from src.visualization.roc import plot_roc_curve
-from src.utils import split_dataset
 
-def tune_svm(X, y):
-    X_train, y_train, X_val, y_val, X_test, y_test = split_dataset(X, y)
+def tune_svm(splits: TrainingSplits, search: str = DEFAULT_SEARCH_STRATEGY, workers: int = 1):
+    """
+    Scores every combination of C and gamma on the validation split
+    :param search: Search strategy, one of SEARCH_STRATEGIES
+    :param workers: Number of candidates fitted at once, -1 uses every core
+    :return: (c_values, gamma_values, val_scores, best_params). With successive halving, candidates dropped
+             in an early round are scored on the subset of the training split they were fitted on
+    """
     c_values = np.logspace(-3, 3, 7)
     gamma_values = np.logspace(-4, 0, 5)
 
-    val_scores = np.zeros((len(c_values), len(gamma_values)))
-    for i, C in enumerate(c_values):
-        for j, gamma in enumerate(gamma_values):
-            svm = SVC(kernel="rbf", C=C, gamma=gamma)
-            svm.fit(X_train, y_train)
-            val_scores[i, j] = svm.score(X_val, y_val)
+    svm = make_pipeline(StandardScaler(), SVC(kernel="rbf"))
+    param_grid = {"svc__C": list(c_values), "svc__gamma": list(gamma_values)}
+    result = search_hyperparameters(
+        svm, param_grid, splits.X_train, splits.y_train, splits.X_val, splits.y_val, search, workers, splits.seed)
+    print(result.report())
 
-    return c_values, gamma_values, val_scores
+    val_scores = grid_scores(result, "svc__C", c_values, "svc__gamma", gamma_values)
+    return c_values, gamma_values, val_scores, (result.best_params["svc__C"], result.best_params["svc__gamma"])
 
 
 def plot_svm_heatmap(C_values, gamma_values, val_scores):
@@ -32,32 +43,43 @@ def plot_svm_heatmap(C_values, gamma_values, val_scores):
     plt.ylabel("C")
     plt.title("SVM Hyperparameter Tuning Heatmap")
     plt.colorbar(label="Validation Accuracy")
-    plt.show()
 
 
-def get_best_hyperparameters(c_values, gamma_values, val_scores):
-    max_index = np.unravel_index(np.argmax(val_scores, axis=None), val_scores.shape)
-    best_C = c_values[max_index[0]]
-    best_gamma = gamma_values[max_index[1]]
-    return best_C, best_gamma
-
-
-def train_svm(X, y):
-    X_train, y_train, X_val, y_val, X_test, y_test = split_dataset(X, y)
-    c_values, gamma_values, val_scores = tune_svm(X, y)
-    plot_svm_heatmap(c_values, gamma_values, val_scores)
-    best_c, best_gamma = get_best_hyperparameters(c_values, gamma_values, val_scores)
+def train_svm(
+        X,
+        y,
+        search: str = DEFAULT_SEARCH_STRATEGY,
+        workers: int = 1,
+        learning_curve_sizes: int = DEFAULT_LEARNING_CURVE_SIZES,
+        report: Report | None = None,
+        seed: int = DEFAULT_TRAINING_SEED,
+):
+    """
+    :param learning_curve_sizes: Number of training set sizes of the learning curve, 0 skips it
+    :param report: Report the heatmap, learning curve and ROC curve are added to, None skips them
+    :param seed: Seed of the dataset split and of the hyperparameter search
+    """
+    splits = TrainingSplits(X, y, seed)
+    c_values, gamma_values, val_scores, (best_c, best_gamma) = tune_svm(splits, search, workers)
     print(f"Best SVM Hyperparameters: C={best_c}, gamma={best_gamma}")
 
-    svm = SVC(kernel="rbf", C=best_c, gamma=best_gamma)
-    plot_learning_curve(svm, X, y)
-    plot_roc_curve(svm, X, y)
+    # The only fit of the final model, shared by the ROC curve and every score below
+    svm = make_pipeline(StandardScaler(), SVC(kernel="rbf", C=best_c, gamma=best_gamma))
+    with timed("model.fit.svm"):
+        svm.fit(splits.X_train, splits.y_train)
+    if report is not None:
+        report.add(plot_svm_heatmap, "svm_c_vs_gamma_heatmap.png", c_values, gamma_values, val_scores)
+        if learning_curve_sizes:
+            # The learning curve fits its own clones of the model
+            report.add(plot_learning_curve, "svm_learning_curve.png",
+                       svm, np.asarray(X), np.asarray(y), learning_curve_sizes)
+        report.add(plot_roc_curve, "svm_roc.png", splits.y_test, splits.scores(svm, "test"))
+    print(f"SVM Train:      ", splits.accuracy(svm, "train"))
+    print(f"SVM Validation: ", splits.accuracy(svm, "val"))
+    print(f"SVM Test:       ", splits.accuracy(svm, "test"))
 
-    svm.fit(X_train, y_train)
-    print(f"SVM Train:      ", svm.score(X_train, y_train))
-    print(f"SVM Validation: ", svm.score(X_val, y_val))
-    print(f"SVM Test:       ", svm.score(X_test, y_test))
-
-    precision, recall = evaluate_precision_and_recall(svm, X_test, y_test)
+    precision, recall = splits.precision_and_recall(svm)
     print(f"Precision: {precision:.3f}")
-    print(f"Recall:    {recall:.3f}")
\ No newline at end of file
+    print(f"Recall:    {recall:.3f}")
+
+    return svm
\ No newline at end of file
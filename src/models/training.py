@@ -0,0 +1,58 @@
+import numpy as np
+from sklearn.metrics import accuracy_score, precision_score, recall_score
+
+from src.constants import DEFAULT_LEARNING_CURVE_SIZES, DEFAULT_TRAINING_SEED
+from src.utils import split_dataset
+
+SPLITS = ["train", "val", "test"]
+
+
+class TrainingSplits:
+    """
+    Training, validation and test splits of a dataset, computed once and shared by tuning, scoring and plotting.
+    Predictions of a fitted model are computed once per split and reused by every metric and plot
+    """
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, seed: int = DEFAULT_TRAINING_SEED):
+        self.X = X
+        self.y = y
+        self.seed = seed
+        self.X_train, self.y_train, self.X_val, self.y_val, self.X_test, self.y_test = split_dataset(X, y, seed=seed)
+        # id of the model -> (model, {(kind, split): outputs}), the model is kept so its id is never reused
+        self._outputs: dict[int, tuple[object, dict]] = {}
+
+
+    def get(self, split: str) -> tuple[np.ndarray, np.ndarray]:
+        """:return: (X, y) of the split"""
+        if split not in SPLITS:
+            raise ValueError(f"Invalid split {split}. Split must be one of {SPLITS}")
+        return getattr(self, f"X_{split}"), getattr(self, f"y_{split}")
+
+
+    def _cached(self, model, kind: str, split: str, compute) -> np.ndarray:
+        _, outputs = self._outputs.setdefault(id(model), (model, {}))
+        if (kind, split) not in outputs:
+            outputs[(kind, split)] = compute(self.get(split)[0])
+        return outputs[(kind, split)]
+
+
+    def predictions(self, model, split: str) -> np.ndarray:
+        return self._cached(model, "predict", split, model.predict)
+
+
+    def scores(self, model, split: str) -> np.ndarray:
+        """Continuous scores of the positive class, for the ROC curve"""
+        if hasattr(model, "predict_proba"):
+            return self._cached(model, "proba", split, lambda X: model.predict_proba(X)[:, 1])
+        if hasattr(model, "decision_function"):
+            return self._cached(model, "decision", split, model.decision_function)
+        raise ValueError("Model does not have predict_proba or decision_function method.")
+
+
+    def accuracy(self, model, split: str) -> float:
+        return accuracy_score(self.get(split)[1], self.predictions(model, split))
+
+
+    def precision_and_recall(self, model, split: str = "test") -> tuple[float, float]:
+        y_true, y_pred = self.get(split)[1], self.predictions(model, split)
+        return precision_score(y_true, y_pred), recall_score(y_true, y_pred)
@@ -0,0 +1,202 @@
+import numpy as np
+
+import src.music.function as fn
+from src.music.generation import FUNCTIONS, FUNCTION_CODES, predecessor_probabilities
+
+_SECONDARY_DOMINANT = FUNCTION_CODES[fn.Function.SecondaryDominant]
+
+
+class ProgressionSpace:
+    """
+    Every valid progression of one class, counted exactly by dynamic programming over the predecessor graph.
+    A diatonic progression is a path through the diatonic predecessor graph ending on the target chord, a
+    non-diatonic progression is a path through the non-diatonic graph that holds at least one secondary dominant.
+
+    Progressions are numbered from 0 to count() - 1, which allows enumerating them, sampling them uniformly
+    without replacement and sampling them with weights, all without generating and rejecting invalid ones.
+    Progressions are int8 arrays of FUNCTION_CODES, like the ones of generate_progressions.
+    """
+
+    def __init__(
+        self,
+        is_diatonic: bool,
+        length: int = 8,
+        target_chord: fn.Function | None = None,
+        weights: np.ndarray | None = None,
+    ):
+        """
+        :param is_diatonic: Class of the progressions
+        :param length: Number of chords of every progression
+        :param target_chord: Last chord of every progression, the tonic by default
+        :param weights: Weight of every transition, weights[i, j] for the function with code j preceding the
+                        one with code i. A progression is sampled with a probability proportional to the product
+                        of the weights of its transitions. Every progression is equally likely by default, use
+                        predecessor_probabilities to follow the random backwards walk of generate_progression
+        """
+        if length < 1:
+            raise ValueError("Length of chord progression must be at least 1")
+        self.is_diatonic = is_diatonic
+        self.length = length
+        self.target = FUNCTION_CODES[target_chord if target_chord is not None else fn.Function.Tonic]
+        predecessors = fn.diatonic_predecessors if is_diatonic else fn.non_diatonic_predecessors
+
+        self.allowed = predecessor_probabilities(predecessors) > 0
+        self.uniform = weights is None
+        self.weights = self.allowed.astype(float) if weights is None else np.where(self.allowed, weights, 0.0)
+
+        # counts[k][f, need] is the number of valid chord sequences of length k ending on f,
+        # restricted to sequences holding a secondary dominant when need is 1
+        num_functions = len(FUNCTIONS)
+        first = np.zeros((num_functions, 2), dtype=object)
+        first[:, 0] = 1
+        first[_SECONDARY_DOMINANT, 1] = 1
+        self._counts = [None, first]
+        # weighted[k] holds the same sums with every sequence weighted by its transitions
+        self._weighted = [None, first.astype(float)]
+        for _ in range(2, length + 1):
+            self._counts.append(self._extend(self._counts[-1], self.allowed.astype(object)))
+            self._weighted.append(self._extend(self._weighted[-1], self.weights))
+
+        self._root_need = 0 if is_diatonic else 1
+
+
+    @staticmethod
+    def _need_after(function: int, need):
+        """Requirement left for the chords before a function, a secondary dominant fulfills it"""
+        return need * (function != _SECONDARY_DOMINANT)
+
+
+    def _extend(self, previous: np.ndarray, transitions: np.ndarray) -> np.ndarray:
+        extended = np.zeros_like(previous)
+        for function in range(len(FUNCTIONS)):
+            for need in (0, 1):
+                extended[function, need] = transitions[function] @ previous[:, self._need_after(function, need)]
+        return extended
+
+
+    def count(self) -> int:
+        """Exact number of valid progressions"""
+        return int(self._counts[self.length][self.target, self._root_need])
+
+
+    def unrank(self, rank: int) -> np.ndarray:
+        """
+        Progression with the given number. Progressions are ordered from their last chord backwards,
+        each chord by its function code
+        """
+        if not 0 <= rank < self.count():
+            raise ValueError(f"Rank {rank} out of range for {self.count()} progressions")
+        progression = np.empty(self.length, dtype=np.int8)
+        progression[-1] = self.target
+        function, need = self.target, self._root_need
+        for k in range(self.length - 1, 0, -1):
+            need = self._need_after(function, need)
+            for predecessor in np.flatnonzero(self.allowed[function]):
+                count = self._counts[k][predecessor, need]
+                if rank < count:
+                    break
+                rank -= count
+            progression[k - 1] = function = predecessor
+        return progression
+
+
+    def rank(self, progression) -> int:
+        """Number of a valid progression, the inverse of unrank"""
+        progression = np.asarray(progression)
+        if len(progression) != self.length or progression[-1] != self.target:
+            raise ValueError("Progression does not belong to this space")
+        rank = 0
+        function, need = self.target, self._root_need
+        for k in range(self.length - 1, 0, -1):
+            need = self._need_after(function, need)
+            predecessor = progression[k - 1]
+            if not self.allowed[function, predecessor]:
+                raise ValueError("Progression does not belong to this space")
+            for earlier in np.flatnonzero(self.allowed[function][:predecessor]):
+                rank += self._counts[k][earlier, need]
+            function = predecessor
+        if need and function != _SECONDARY_DOMINANT:
+            raise ValueError("Progression does not belong to this space")
+        return int(rank)
+
+
+    def enumerate(self) -> np.ndarray:
+        """
+        Every valid progression, ordered by rank
+        :return: int8 array of shape (count(), length)
+        """
+        if self.count() == 0:
+            return np.empty((0, self.length), dtype=np.int8)
+        suffixes = np.full((1, 1), self.target, dtype=np.int8)
+        needs = np.array([self._root_need])
+        for k in range(self.length - 1, 0, -1):
+            functions = suffixes[:, 0]
+            next_needs = self._need_after(functions, needs)
+            # Every suffix is followed by its valid predecessors in code order, which keeps the rows in rank order
+            valid = self.allowed[functions] & (self._counts[k][:, next_needs].T > 0)
+            rows, predecessors = np.nonzero(valid)
+            suffixes = np.column_stack([predecessors.astype(np.int8), suffixes[rows]])
+            needs = next_needs[rows]
+        return suffixes
+
+
+    def sample(self, num_progressions: int, rng: np.random.Generator | int | None = None) -> np.ndarray:
+        """
+        Samples progressions with replacement, every progression with a probability proportional to its weight
+        :return: int8 array of shape (num_progressions, length)
+        """
+        if self.count() == 0:
+            raise ValueError("No valid progressions to sample from")
+        rng = np.random.default_rng(rng)
+        progressions = np.empty((num_progressions, self.length), dtype=np.int8)
+        progressions[:, -1] = self.target
+        needs = np.full(num_progressions, self._root_need)
+        for k in range(self.length - 1, 0, -1):
+            functions = progressions[:, k]
+            needs = self._need_after(functions, needs)
+            # Probability of every predecessor is its transition weight times the weight of the sequences before it
+            probabilities = self.weights[functions] * self._weighted[k][:, needs].T
+            cdf = np.cumsum(probabilities, axis=1)
+            samples = rng.random(num_progressions) * cdf[:, -1]
+            progressions[:, k - 1] = np.minimum((cdf <= samples[:, None]).sum(axis=1), len(FUNCTIONS) - 1)
+        return progressions
+
+
+    def sample_unique(self, num_progressions: int, rng: np.random.Generator | int | None = None) -> np.ndarray:
+        """
+        Samples distinct progressions. Without weights every subset of progressions is equally likely,
+        with weights progressions are drawn by weight and repeated draws are skipped
+        :return: int8 array of shape (num_progressions, length)
+        """
+        if num_progressions > self.count():
+            raise ValueError(
+                f"Requested {num_progressions} distinct progressions but only {self.count()} exist"
+            )
+        rng = np.random.default_rng(rng)
+        if self.uniform:
+            ranks = rng.choice(self.count(), size=num_progressions, replace=False)
+            return np.array([self.unrank(int(rank)) for rank in ranks], dtype=np.int8).reshape(-1, self.length)
+
+        unique: dict[bytes, np.ndarray] = {}
+        while len(unique) < num_progressions:
+            for progression in self.sample(2 * (num_progressions - len(unique)), rng):
+                unique.setdefault(progression.tobytes(), progression)
+                if len(unique) == num_progressions:
+                    break
+        return np.array(list(unique.values()), dtype=np.int8).reshape(-1, self.length)
+
+
+def sample_stratified_progressions(
+    num_per_class: int,
+    length: int = 8,
+    rng: np.random.Generator | int | None = None,
+) -> dict[bool, np.ndarray]:
+    """
+    Distinct progressions with the same number for every class, sampled uniformly within each class
+    :return: Mapping of is_diatonic to an int8 array of shape (num_per_class, length)
+    """
+    rng = np.random.default_rng(rng)
+    return {
+        is_diatonic: ProgressionSpace(is_diatonic, length).sample_unique(num_per_class, rng)
+        for is_diatonic in (True, False)
+    }
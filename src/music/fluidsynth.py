@@ -1,8 +1,31 @@
 import subprocess
+import tempfile
+import threading
+import numpy as np
 from pathlib import Path
 
+import src.constants as c
 import src.paths as paths
+from src.instrumentation import timed
 
+try:
+    import fluidsynth as pyfluidsynth
+except (ImportError, OSError):
+    # The bindings are optional, they also fail to import when the FluidSynth library itself is missing
+    pyfluidsynth = None
+
+
+_synthesis_backend = c.DEFAULT_SYNTHESIS_BACKEND
+
+_FLUIDSYNTH_CHANNEL = 0
+_NUM_OUTPUT_CHANNELS = 2
+# Number of frames synthesized at a time between note events
+_RENDER_BLOCK_FRAMES = 4096
+
+_thread_local = threading.local()
+
+
+@timed("fluidsynth.subprocess")
 def midi_to_wave(
     midi_path: Path,
     wave_path: Path,
@@ -10,14 +33,131 @@ def midi_to_wave(
     bank: int = 0,
     preset: int = 0
 ):
-    paths.TEMP_FLUIDSYNTH_FSC.parent.mkdir(parents=True, exist_ok=True)
-    paths.TEMP_FLUIDSYNTH_FSC.write_text(f"select 0 1 {bank} {preset}")
-
-    subprocess.run([
-        "fluidsynth", "-ni",
-        "-F", wave_path,
-        "-r", "44100",
-        "-f", paths.TEMP_FLUIDSYNTH_FSC,
+    # Every call gets its own command file so concurrent renders cannot overwrite each other's preset selection
+    paths.TEMP_FLUIDSYNTH_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", suffix=".fsc", dir=paths.TEMP_FLUIDSYNTH_DIR, delete=False) as fsc_file:
+        fsc_file.write(f"select 0 1 {bank} {preset}")
+    fsc_path = Path(fsc_file.name)
+
+    try:
+        subprocess.run([
+            "fluidsynth", "-ni",
+            "-F", wave_path,
+            "-r", "44100",
+            "-f", fsc_path,
+            soundfont_path,
+            midi_path,
+        ], check=True, stdout=subprocess.DEVNULL)
+    finally:
+        fsc_path.unlink(missing_ok=True)
+
+
+def set_synthesis_backend(backend: str):
+    """
+    Selects how songs are synthesized
+    :param backend: library renders in-process through the pyfluidsynth bindings, subprocess runs the
+                    fluidsynth cli for every song, auto uses the bindings whenever they are available
+    """
+    global _synthesis_backend
+    if backend not in c.SYNTHESIS_BACKENDS:
+        raise ValueError(f"Invalid synthesis backend {backend}. Backend must be one of {c.SYNTHESIS_BACKENDS}")
+    if backend == "library" and pyfluidsynth is None:
+        raise RuntimeError("The library synthesis backend requires pyfluidsynth and the FluidSynth library")
+    _synthesis_backend = backend
+
+
+def get_synthesis_backend() -> str:
+    return _synthesis_backend
+
+
+def use_library_synthesis() -> bool:
+    if _synthesis_backend == "auto":
+        return pyfluidsynth is not None
+    return _synthesis_backend == "library"
+
+
+class FluidSynthRenderer:
+    """
+    In-process FluidSynth synthesizer. Soundfonts are loaded once and stay resident for the lifetime
+    of the renderer, and audio is rendered straight into memory instead of through a wave file.
+    The synthesizer is not thread safe, use get_renderer to get one per thread.
+    """
+
+    def __init__(self, sample_rate: int = c.SAMPLE_RATE):
+        if pyfluidsynth is None:
+            raise RuntimeError("pyfluidsynth and the FluidSynth library are required for in-process synthesis")
+        self.sample_rate = sample_rate
+        self._synth = pyfluidsynth.Synth(samplerate=float(sample_rate))
+        self._soundfont_ids: dict[str, int] = {}
+
+
+    def _soundfont_id(self, soundfont_path) -> int:
+        key = str(soundfont_path)
+        if key not in self._soundfont_ids:
+            soundfont_id = self._synth.sfload(key)
+            if soundfont_id == -1:
+                raise RuntimeError(f"Unable to load soundfont {soundfont_path}")
+            self._soundfont_ids[key] = soundfont_id
+        return self._soundfont_ids[key]
+
+
+    def _render_frames(self, num_frames: int, blocks: list[np.ndarray]):
+        while num_frames > 0:
+            block_frames = min(num_frames, _RENDER_BLOCK_FRAMES)
+            blocks.append(np.asarray(self._synth.get_samples(block_frames), dtype=np.int16))
+            num_frames -= block_frames
+
+
+    @timed("fluidsynth.library")
+    def render(
+        self,
+        notes: list[tuple[int, float, float, int]],
         soundfont_path,
-        midi_path,
-    ], check=True, stdout=subprocess.DEVNULL)
+        bank: int = 0,
+        preset: int = 0,
+    ) -> np.ndarray:
+        """
+        Renders notes with a soundfont preset.
+        The samples stay int16, the format get_samples of pyfluidsynth returns: they are written to the wave files
+        and kept in the render cache as they are, at half the size of float32, with no rounding on the way.
+        Feature extraction gets its float32 signal from to_mono_float, still without going through a file
+        :param notes: (pitch, start, duration, velocity) of every note, with times in seconds
+        :return: int16 array of shape (frames, 2), lasting until the last note is released
+        """
+        self._synth.system_reset()
+        self._synth.program_select(_FLUIDSYNTH_CHANNEL, self._soundfont_id(soundfont_path), bank, preset)
+
+        events = []
+        for pitch, start, duration, velocity in notes:
+            events.append((round(start * self.sample_rate), 1, pitch, velocity))
+            events.append((round((start + duration) * self.sample_rate), 0, pitch, 0))
+        # Note offs sort before note ons at the same frame, so repeated pitches are retriggered
+        events.sort()
+
+        blocks = []
+        frame = 0
+        for event_frame, is_note_on, pitch, velocity in events:
+            self._render_frames(event_frame - frame, blocks)
+            frame = event_frame
+            if is_note_on:
+                self._synth.noteon(_FLUIDSYNTH_CHANNEL, pitch, velocity)
+            else:
+                self._synth.noteoff(_FLUIDSYNTH_CHANNEL, pitch)
+
+        if not blocks:
+            return np.zeros((0, _NUM_OUTPUT_CHANNELS), dtype=np.int16)
+        return np.concatenate(blocks).reshape(-1, _NUM_OUTPUT_CHANNELS)
+
+
+def get_renderer() -> FluidSynthRenderer:
+    """Returns the renderer of the calling thread, creating it on first use"""
+    renderer = getattr(_thread_local, "renderer", None)
+    if renderer is None:
+        renderer = FluidSynthRenderer()
+        _thread_local.renderer = renderer
+    return renderer
+
+
+def to_mono_float(samples: np.ndarray) -> np.ndarray:
+    """Converts int16 (frames, channels) samples to a mono float32 signal, as librosa.load would"""
+    return (samples.astype(np.float32) / 32768.0).mean(axis=1)
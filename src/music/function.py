@@ -9,15 +9,17 @@ class Function(StrEnum):
     SecondaryDominant = "SecondaryDominant"
 
 
-    def rand_roman_numeral(self) -> str:
+    def rand_roman_numeral(self, rng: random.Random | None = None) -> str:
+        """Draws one of the roman numerals of the chords with this function, the tonic always being I"""
+        rng = rng or random
         if self == Function.Tonic:
             return "I"
         if self == Function.TonicLike:
-            return random.choice(["iii", "vi"])
+            return rng.choice(["iii", "vi"])
         if self == Function.Subdominant:
-            return random.choice(["ii", "IV"])
+            return rng.choice(["ii", "IV"])
         if self == Function.Dominant:
-            return random.choice(["V", "viio"])
+            return rng.choice(["V", "viio"])
         raise ValueError(f"Unable to get roman numeral for {self}")
 
 
@@ -1,65 +1,176 @@
+import numpy as np
 import random
 
 import src.music.function as fn
 
+# Integer code of every function in batch generated progressions, the index of the function in this list
+FUNCTIONS: list[fn.Function] = list(fn.Function)
+FUNCTION_CODES: dict[fn.Function, int] = {function: code for code, function in enumerate(FUNCTIONS)}
+
+# Functions a secondary dominant may be inserted before, it cannot precede the tonic chord which is already in the key
+SECONDARY_DOMINANT_TARGETS = {fn.Function.TonicLike, fn.Function.Subdominant, fn.Function.Dominant}
+
 def generate_progression(
     predecessors: fn.PredecessorMap,
     length: int,
     target_chord: fn.Function | None = None,
+    rng: random.Random | None = None,
 ) -> list[fn.Function]:
+    """
+    Generates a progression backwards from its last chord, every chord being drawn from the predecessors of the next
+    :param target_chord: Function of the last chord, the tonic by default
+    """
     if length < 4:
         raise ValueError("Length of chord progression must be at least 4")
     if target_chord is None:
         target_chord = fn.Function.Tonic
-    progression = [target_chord]
-    next_chord = target_chord
-    for i in range(1, length):
-        prev_chord = random.choice(predecessors[next_chord])
-        progression.insert(0, prev_chord)
-        next_chord = prev_chord
+    rng = rng or random
+    progression = [target_chord] * length
+    for i in range(length - 2, -1, -1):
+        progression[i] = rng.choice(predecessors[progression[i + 1]])
     return progression
 
 
 def generate_diatonic_progression(
     length: int,
     target_chord: fn.Function | None = None,
+    rng: random.Random | None = None,
 ) -> list[fn.Function]:
-    return generate_progression(fn.diatonic_predecessors, length, target_chord)
+    return generate_progression(fn.diatonic_predecessors, length, target_chord, rng)
 
 
 def generate_non_diatonic_progression(
     length: int,
     target_chord: fn.Function | None = None,
+    rng: random.Random | None = None,
 ) -> list[fn.Function]:
+    rng = rng or random
     while True:
-        progression = generate_progression(fn.non_diatonic_predecessors, length, target_chord)
+        progression = generate_progression(fn.non_diatonic_predecessors, length, target_chord, rng)
         # if we contain a secondary dominant return the progression
         if fn.Function.SecondaryDominant in progression:
             return progression
         # otherwise, find a place to insert at least one secondary dominant
-        # we cannot place a secondary dominant before the tonic chord (it will be already in the key)
-        valid_targets = {fn.Function.TonicLike, fn.Function.Subdominant, fn.Function.Dominant}
         candidate_indices = [
             i for i in range(length - 1)
-            if progression[i + 1] in valid_targets
+            if progression[i + 1] in SECONDARY_DOMINANT_TARGETS
         ]
 
         if not candidate_indices:
             continue
 
-        progression[random.choice(candidate_indices)] = fn.Function.SecondaryDominant
+        progression[rng.choice(candidate_indices)] = fn.Function.SecondaryDominant
         return progression
     raise RuntimeError("Unreachable code path")
 
 
-def generate_roman_numerals(progression: list[fn.Function]) -> list[str]:
-    numerals: list[str] = []
+def generate_roman_numerals(progression: list[fn.Function], rng: random.Random | None = None) -> list[str]:
+    numerals: list[str] = [""] * len(progression)
     for i in range(len(progression) - 1, -1, -1):
-        if progression[i] == fn.Function.SecondaryDominant and not numerals:
+        if progression[i] == fn.Function.SecondaryDominant and i == len(progression) - 1:
             raise ValueError("SecondaryDominant found at the end of progression")
         if progression[i] == fn.Function.SecondaryDominant:
-            numerals.insert(0, f"V7/{numerals[0]}")
+            numerals[i] = f"V7/{numerals[i + 1]}"
             continue
-        numerals.insert(0, progression[i].rand_roman_numeral())
+        numerals[i] = progression[i].rand_roman_numeral(rng)
     return numerals
 
+
+def predecessor_probabilities(predecessors: fn.PredecessorMap) -> np.ndarray:
+    """
+    Transition matrix of a predecessor map. Row i holds the probability of every function preceding
+    the function with code i, each predecessor being equally likely as with random.choice
+    :return: Array of shape (len(FUNCTIONS), len(FUNCTIONS))
+    """
+    probabilities = np.zeros((len(FUNCTIONS), len(FUNCTIONS)))
+    for function, function_predecessors in predecessors.items():
+        for predecessor in function_predecessors:
+            probabilities[FUNCTION_CODES[function], FUNCTION_CODES[predecessor]] += 1 / len(function_predecessors)
+    return probabilities
+
+
+def predecessor_cdf(predecessors: fn.PredecessorMap) -> np.ndarray:
+    """Cumulative version of predecessor_probabilities, used to sample predecessors"""
+    cdf = np.cumsum(predecessor_probabilities(predecessors), axis=1)
+    # Guards against rounding leaving the last reachable predecessor just below a uniform sample
+    cdf[cdf[:, -1] > 0, -1] = 1.0
+    return cdf
+
+
+def generate_progressions(
+    predecessors: fn.PredecessorMap,
+    num_progressions: int,
+    length: int,
+    target_chord: fn.Function | None = None,
+    rng: np.random.Generator | int | None = None,
+) -> np.ndarray:
+    """
+    Batch version of generate_progression, every row follows the same distribution
+    :param rng: NumPy generator or seed, progressions are reproducible for the same seed
+    :return: int8 array of shape (num_progressions, length) holding FUNCTION_CODES
+    """
+    if length < 4:
+        raise ValueError("Length of chord progression must be at least 4")
+    if target_chord is None:
+        target_chord = fn.Function.Tonic
+    rng = np.random.default_rng(rng)
+    cdf = predecessor_cdf(predecessors)
+
+    progressions = np.empty((num_progressions, length), dtype=np.int8)
+    progressions[:, -1] = FUNCTION_CODES[target_chord]
+    for i in range(length - 2, -1, -1):
+        samples = rng.random(num_progressions)
+        # Index of the first predecessor whose cumulative probability exceeds the sample
+        progressions[:, i] = (cdf[progressions[:, i + 1]] <= samples[:, None]).sum(axis=1)
+    return progressions
+
+
+def generate_diatonic_progressions(
+    num_progressions: int,
+    length: int,
+    target_chord: fn.Function | None = None,
+    rng: np.random.Generator | int | None = None,
+) -> np.ndarray:
+    return generate_progressions(fn.diatonic_predecessors, num_progressions, length, target_chord, rng)
+
+
+def generate_non_diatonic_progressions(
+    num_progressions: int,
+    length: int,
+    target_chord: fn.Function | None = None,
+    rng: np.random.Generator | int | None = None,
+) -> np.ndarray:
+    """
+    Batch version of generate_non_diatonic_progression. Progressions without a secondary dominant get one
+    at a random valid position, and progressions without a valid position are generated again
+    """
+    rng = np.random.default_rng(rng)
+    secondary_dominant = FUNCTION_CODES[fn.Function.SecondaryDominant]
+    target_codes = [FUNCTION_CODES[function] for function in SECONDARY_DOMINANT_TARGETS]
+
+    progressions = np.empty((num_progressions, length), dtype=np.int8)
+    pending = np.arange(num_progressions)
+    while len(pending):
+        batch = generate_progressions(fn.non_diatonic_predecessors, len(pending), length, target_chord, rng)
+        missing = ~(batch == secondary_dominant).any(axis=1)
+
+        # candidates[j, i] is True when a secondary dominant can replace chord i of progression j
+        candidates = np.isin(batch[:, 1:], target_codes) & missing[:, None]
+        num_candidates = candidates.sum(axis=1)
+        rejected = missing & (num_candidates == 0)
+
+        fixable = np.flatnonzero(missing & ~rejected)
+        # Picks the k-th candidate of every progression, k uniform over its candidates
+        picks = (rng.random(len(fixable)) * num_candidates[fixable]).astype(np.int64)
+        positions = (np.cumsum(candidates[fixable], axis=1) <= picks[:, None]).sum(axis=1)
+        batch[fixable, positions] = secondary_dominant
+
+        progressions[pending[~rejected]] = batch[~rejected]
+        pending = pending[rejected]
+    return progressions
+
+
+def decode_progressions(progressions: np.ndarray) -> list[list[fn.Function]]:
+    """Converts batch generated progressions back into lists of functions"""
+    return [[FUNCTIONS[code] for code in progression] for progression in progressions.tolist()]
+
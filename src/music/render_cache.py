@@ -0,0 +1,65 @@
+import threading
+import numpy as np
+from pathlib import Path
+
+import src.paths as paths
+from src.files import atomic_write
+from src.instrumentation import count, timed
+
+
+class RenderCache:
+    """
+    Rendered audio of songs keyed by Song.render_key. Songs with the same progression, key,
+    soundfont preset and tempo are only synthesized once, every later occurrence reuses the audio.
+    Safe to share between threads.
+    """
+
+    def __init__(self, root: Path = paths.RENDER_CACHE_DIR):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+
+    def _entry_path(self, render_key: str) -> Path:
+        return self.root / f"{render_key}.npy"
+
+
+    @timed("render_cache.get")
+    def get(self, render_key: str) -> np.ndarray | None:
+        entry_path = self._entry_path(render_key)
+        if not entry_path.exists():
+            return None
+        return np.load(entry_path)
+
+
+    @timed("render_cache.put")
+    def put(self, render_key: str, samples: np.ndarray):
+        with atomic_write(self._entry_path(render_key)) as f:
+            np.save(f, samples)
+
+
+    def record(self, hit: bool):
+        count("render_cache.hits" if hit else "render_cache.misses")
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+    def render(self, song) -> np.ndarray:
+        """Returns the audio of the song, only synthesizing it if no identical song was rendered before"""
+        render_key = song.render_key()
+        samples = self.get(render_key)
+        self.record(samples is not None)
+        if samples is None:
+            samples = song.render()
+            self.put(render_key, samples)
+        return samples
+
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        dedup_ratio = self.hits / total * 100 if total else 0.0
+        return f"Render cache: {self.hits} reused, {self.misses} rendered ({dedup_ratio:.1f}% deduplicated)"
@@ -1,70 +1,173 @@
-import music21
+import hashlib
+import json
+import numpy as np
 import random
 import shutil
+import soundfile
+import tempfile
 from midiutil import MIDIFile
 from tqdm import tqdm
+from typing import NamedTuple
 from pathlib import Path
 
+import src.constants as c
 import src.paths as paths
 from src.music.generation import (
     generate_diatonic_progression,
     generate_non_diatonic_progression,
     generate_roman_numerals,
 )
-from src.music.fluidsynth import midi_to_wave
+from src.music.function import Function
+from src.music.fluidsynth import get_renderer, midi_to_wave, use_library_synthesis
+from src.music.voicings import PITCHES, get_voicing
 from src.soundfonts import get_random_soundfont_preset
 
 
-PITCHES = ['C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'A-', 'A', 'B-', 'B']
-# PITCHES = ["C"]
-KEYS = [music21.key.Key(p, 'major') for p in PITCHES]
+# Tonics of the major keys songs are written in
+KEYS = PITCHES
 
 NUM_TRACKS:   int = 2
 CHORD_TRACK:  int = 0
 BASS_TRACK:   int = 1
 
+CHANNEL:      int = 0
+VOLUME:       int = 100
+BPM:          int = 120
+CHORD_BEATS:  int = 4
 
-class Song:
-    key: music21.key.Key
-    progression: list[str]
 
-    def __init__(self, is_diatonic: bool):
-        if is_diatonic:
-            functions = generate_diatonic_progression(8)
-        else:
-            functions = generate_non_diatonic_progression(8)
-        self.progression = generate_roman_numerals(functions)
-        self.key = random.choice(KEYS)
-        self.sf_preset = get_random_soundfont_preset()
+class Note(NamedTuple):
+    track: int
+    pitch: int
+    time: float
+    duration: float
+    volume: int
 
 
-    def write(self, path: Path) -> None:
-        channel = 0
-        volume = 100
-        bpm = 120
+def progression_notes(progression: list[str], key: str) -> list[Note]:
+    """
+    Notes of a progression of roman numerals played in a major key, with times and durations in beats.
+    Every chord is voiced over its root two octaves down in the bass track
+    """
+    notes = []
+    time = 0
+    for numeral in progression:
+        voicing = get_voicing(numeral, key)
+
+        notes.append(Note(BASS_TRACK, voicing.root - 24, time, CHORD_BEATS, VOLUME))
+        for pitch in voicing.pitches:
+            notes.append(Note(CHORD_TRACK, pitch - 12, time, CHORD_BEATS, VOLUME))
+        time += CHORD_BEATS
+    return notes
+
+
+class Song:
+    is_diatonic: bool
+    key: str
+    progression: list[str]
 
+    def __init__(self, is_diatonic: bool, functions: list[Function] | None = None, rng: random.Random | None = None):
+        """
+        :param is_diatonic: Whether the song contains no secondary dominants
+        :param functions: Harmonic functions of the chords, a random progression of the class is generated by default
+        :param rng: Random generator the progression, key and preset are drawn from, in that order.
+                    The global one of the random module by default, like every generation function taking an rng
+        """
+        rng = rng or random
+        self.is_diatonic = is_diatonic
+        if functions is None and is_diatonic:
+            functions = generate_diatonic_progression(c.NUM_CHORDS, rng=rng)
+        elif functions is None:
+            functions = generate_non_diatonic_progression(c.NUM_CHORDS, rng=rng)
+        self.progression = generate_roman_numerals(functions, rng)
+        self.key = rng.choice(KEYS)
+        self.sf_preset = get_random_soundfont_preset(rng)
+
+
+    def render_key(self) -> str:
+        """
+        Hash of everything that determines the rendered audio of the song, identical songs share the same key
+        """
+        identity = json.dumps({
+            "numerals": self.progression,
+            "key": self.key,
+            "mode": "major",
+            "soundfont": str(Path(self.sf_preset["path"]).resolve()),
+            "bank": self.sf_preset["bank"],
+            "preset": self.sf_preset["preset"],
+            "tempo": BPM,
+            "sample_rate": c.SAMPLE_RATE,
+            "backend": "library" if use_library_synthesis() else "subprocess",
+        }, sort_keys=True)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+
+    def notes(self) -> list[Note]:
+        """Notes of the song, with times and durations in beats"""
+        return progression_notes(self.progression, self.key)
+
+
+    def _write_midi(self, midi_path: Path) -> None:
         mf = MIDIFile(NUM_TRACKS)
         for track in range(NUM_TRACKS):
-            mf.addTempo(track, channel, bpm)
+            mf.addTempo(track, CHANNEL, BPM)
 
-        time = 0
-        for numeral in self.progression:
-            chord = music21.roman.RomanNumeral(numeral, self.key)
-
-            mf.addNote(BASS_TRACK, channel, chord.root().midi - 24, time, 4, volume)
-            for pitch in chord.pitches:
-                mf.addNote(CHORD_TRACK, channel, pitch.midi - 12, time, 4, volume)
-            time += 4
+        for note in self.notes():
+            mf.addNote(note.track, CHANNEL, note.pitch, note.time, note.duration, note.volume)
 
-        midi_path = path.with_suffix(".mid")
         midi_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(midi_path, "wb") as f:
+            mf.writeFile(f)
+
 
+    def _render_with_library(self) -> np.ndarray:
+        seconds_per_beat = 60 / BPM
+        notes = [
+            (note.pitch, note.time * seconds_per_beat, note.duration * seconds_per_beat, note.volume)
+            for note in self.notes()
+        ]
+        return get_renderer().render(
+            notes,
+            self.sf_preset["path"],
+            bank=self.sf_preset["bank"],
+            preset=self.sf_preset["preset"]
+        )
+
+
+    def render(self) -> np.ndarray:
+        """
+        Synthesizes the song into memory
+        :return: int16 samples of shape (frames, 2)
+        """
+        if use_library_synthesis():
+            return self._render_with_library()
+
+        paths.TEMP_FLUIDSYNTH_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=paths.TEMP_FLUIDSYNTH_DIR) as temp_dir:
+            temp_path = Path(temp_dir) / "song"
+            self.write(temp_path)
+            samples, _ = soundfile.read(temp_path.with_suffix(".wav"), dtype="int16", always_2d=True)
+        return samples
+
+
+    @staticmethod
+    def write_samples(path: Path, samples: np.ndarray) -> None:
+        """Writes samples returned by render as the wave file of the song"""
         wave_path = path.with_suffix(".wav")
         wave_path.parent.mkdir(parents=True, exist_ok=True)
+        soundfile.write(wave_path, samples, c.SAMPLE_RATE, subtype="PCM_16")
 
-        with open(midi_path, "wb") as f:
-            mf.writeFile(f)
 
+    def write(self, path: Path) -> None:
+        if use_library_synthesis():
+            self.write_samples(path, self._render_with_library())
+            return
+
+        wave_path = path.with_suffix(".wav")
+        wave_path.parent.mkdir(parents=True, exist_ok=True)
+
+        midi_path = path.with_suffix(".mid")
+        self._write_midi(midi_path)
         midi_to_wave(midi_path, wave_path,
             self.sf_preset["path"],
             bank=self.sf_preset["bank"],
@@ -74,7 +177,8 @@ class Song:
 
 
     def string_info(self) -> str:
-        info = f"{self.sf_preset["name"]:>20} {self.sf_preset["preset"]:>4}  {str(self.key):>10}"
+        key_name = f"{self.key} major"
+        info = f"{self.sf_preset["name"]:>20} {self.sf_preset["preset"]:>4}  {key_name:>10}"
         for numeral in self.progression:
             info += f" {numeral:>10}"
         return info
\ No newline at end of file
@@ -0,0 +1,94 @@
+import json
+from typing import NamedTuple
+
+import src.paths as paths
+from src.files import atomic_write
+
+# Tonics of the major keys songs are written in, spelled the way music21 expects them
+PITCHES = ['C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'A-', 'A', 'B-', 'B']
+DIATONIC_NUMERALS = ["I", "ii", "iii", "IV", "V", "vi", "viio"]
+# Every numeral the progression generator can produce, secondary dominants resolve to a diatonic chord
+NUMERALS = DIATONIC_NUMERALS + [f"V7/{numeral}" for numeral in DIATONIC_NUMERALS]
+
+# Bump when the content of the table changes, so tables written by older versions are rebuilt
+_TABLE_VERSION = 1
+
+_voicings = None
+
+
+class Voicing(NamedTuple):
+    root: int
+    pitches: tuple[int, ...]
+
+
+def _build_voicing(numeral: str, tonic: str) -> Voicing:
+    # music21 is slow to import and only needed when the table is missing an entry
+    import music21
+
+    chord = music21.roman.RomanNumeral(numeral, music21.key.Key(tonic, "major"))
+    return Voicing(chord.root().midi, tuple(pitch.midi for pitch in chord.pitches))
+
+
+def build_voicing_table(numerals: list[str] = NUMERALS, tonics: list[str] = PITCHES) -> dict[str, dict[str, Voicing]]:
+    """
+    Builds the MIDI pitches of every numeral in every major key with music21
+    :return: Mapping of tonic to numeral to voicing
+    """
+    return {tonic: {numeral: _build_voicing(numeral, tonic) for numeral in numerals} for tonic in tonics}
+
+
+def _save_voicing_table(table: dict[str, dict[str, Voicing]]):
+    serialized = {
+        "version": _TABLE_VERSION,
+        "voicings": {
+            tonic: {numeral: {"root": voicing.root, "pitches": list(voicing.pitches)} for numeral, voicing in voicings.items()}
+            for tonic, voicings in table.items()
+        },
+    }
+    with atomic_write(paths.VOICINGS_TABLE, "w") as f:
+        json.dump(serialized, f)
+
+
+def _load_voicing_table() -> dict[str, dict[str, Voicing]] | None:
+    if not paths.VOICINGS_TABLE.exists():
+        return None
+    try:
+        with paths.VOICINGS_TABLE.open() as f:
+            serialized = json.load(f)
+    except json.JSONDecodeError:
+        return None
+    if serialized.get("version") != _TABLE_VERSION:
+        return None
+
+    return {
+        tonic: {numeral: Voicing(entry["root"], tuple(entry["pitches"])) for numeral, entry in voicings.items()}
+        for tonic, voicings in serialized["voicings"].items()
+    }
+
+
+def _get_voicing_table() -> dict[str, dict[str, Voicing]]:
+    global _voicings
+    if _voicings is not None:
+        return _voicings
+
+    _voicings = _load_voicing_table()
+    if _voicings is None:
+        _voicings = build_voicing_table()
+        _save_voicing_table(_voicings)
+    return _voicings
+
+
+def get_voicing(numeral: str, tonic: str) -> Voicing:
+    """
+    MIDI pitches of a roman numeral in a major key, read from the precomputed table
+    :param numeral: Roman numeral as produced by the progression generator, e.g. "viio" or "V7/ii"
+    :param tonic: Tonic of the key, one of PITCHES
+    """
+    table = _get_voicing_table()
+    voicing = table.get(tonic, {}).get(numeral)
+    if voicing is None:
+        # Numerals outside the table are built once and added to it
+        voicing = _build_voicing(numeral, tonic)
+        table.setdefault(tonic, {})[numeral] = voicing
+        _save_voicing_table(table)
+    return voicing
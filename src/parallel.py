@@ -0,0 +1,44 @@
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+
+def bounded_ordered_map(
+        fn: Callable,
+        items: Iterable,
+        workers: int,
+        max_in_flight: int | None = None,
+        executor: Executor | None = None,
+) -> Iterator:
+    """
+    Applies fn to every item concurrently and yields the results in the order of the items.
+    Items are pulled lazily and at most max_in_flight of them are submitted at once, so a slow
+    consumer holds back the producer instead of letting results pile up in memory
+    :param fn: Function applied to every item
+    :param items: Items to process, consumed lazily
+    :param workers: Number of worker threads, 1 runs everything in the calling thread
+    :param max_in_flight: Maximum number of submitted but not yet yielded items, defaults to twice the workers
+    :param executor: Executor to submit to instead of a new thread pool
+    """
+    if workers == 1 and executor is None:
+        for item in items:
+            yield fn(item)
+        return
+
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        in_flight = deque()
+        for item in items:
+            in_flight.append(executor.submit(fn, item))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+    finally:
+        if owns_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
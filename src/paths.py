@@ -8,6 +8,7 @@ TEMP_DIR:       Path = PROJECT_DIR / "temp"
 INFO_DIR:       Path = PROJECT_DIR / "info"
 GRAPHS_DIR:     Path = PROJECT_DIR / "graphs"
 CACHE_DIR:      Path = PROJECT_DIR / "cache"
+MODELS_DIR:     Path = PROJECT_DIR / "models"
 
 
 # DATA
@@ -20,12 +21,17 @@ SOUNDFONTS_SF2_DIR: Path = SOUNDFONTS_DIR / "sf2"
 
 # TEMP
 TEMP_SOUNDFONTS_DIR: Path = TEMP_DIR / "soundfonts"
-TEMP_FLUIDSYNTH_FSC: Path = TEMP_DIR / "select.fsc"
+TEMP_FLUIDSYNTH_DIR: Path = TEMP_DIR / "fluidsynth"
 
 # INFO
 INFO_DIATONIC_TXT:     Path = INFO_DIR / "diatonic.txt"
 INFO_NON_DIATONIC_TXT: Path = INFO_DIR / "non-diatonic.txt"
 
+# CACHE
+FEATURE_STORE_DIR: Path = CACHE_DIR / "store"
+RENDER_CACHE_DIR:  Path = CACHE_DIR / "renders"
+VOICINGS_TABLE:    Path = CACHE_DIR / "voicings.json"
+
 # GRAPHS
 GRAPHS_MFCC_DIR: Path = GRAPHS_DIR / "mfcc"
 GRAPHS_TONNETZ_DIR: Path = GRAPHS_DIR / "tonnetz"
@@ -0,0 +1,83 @@
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from typing import Callable
+
+from src.serving.metrics import ServiceMetrics
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects feature vectors submitted by concurrent requests and classifies them together,
+    so the model runs on stacked matrices instead of once per file. A batch is sent to the model
+    once it holds max_batch_size vectors or max_wait_seconds passed since its first vector arrived
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_seconds: float = 0.01,
+        metrics: ServiceMetrics | None = None,
+    ):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.metrics = metrics
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+
+    def submit(self, features: np.ndarray) -> Future:
+        """:return: Future resolving to the predicted label of the feature vector"""
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+
+    def _collect_batch(self, first) -> tuple[list, bool]:
+        batch = [first]
+        wait_until = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stopping = self._collect_batch(first)
+
+            try:
+                labels = self.predict(np.stack([features for features, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            if self.metrics is not None:
+                self.metrics.record_batch(len(batch))
+            for (_, future), label in zip(batch, labels):
+                future.set_result(label)
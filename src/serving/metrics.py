@@ -0,0 +1,59 @@
+import threading
+import time
+import numpy as np
+from collections import deque
+
+# Number of most recent files the latency percentiles and the throughput are computed over
+LATENCY_WINDOW = 10_000
+
+
+class ServiceMetrics:
+    """Thread-safe counters, latency percentiles and throughput of the inference service"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.started = time.perf_counter()
+        self.files = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_files = 0
+        # (completion time, latency) of the most recent files
+        self._recent: deque[tuple[float, float]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+
+    def record_file(self, latency_seconds: float, ok: bool):
+        with self._lock:
+            self.files += 1
+            if not ok:
+                self.errors += 1
+            self._recent.append((time.perf_counter(), latency_seconds))
+
+
+    def record_batch(self, size: int):
+        with self._lock:
+            self.batches += 1
+            self.batched_files += size
+
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = np.array(self._recent) if self._recent else np.empty((0, 2))
+            files, errors, batches, batched_files = self.files, self.errors, self.batches, self.batched_files
+
+        now = time.perf_counter()
+        throughput = 0.0
+        if len(recent) > 1:
+            # Files per second over the span of the recent window, so idle time before it does not count
+            throughput = len(recent) / max(now - recent[0, 0] + recent[0, 1], 1e-9)
+
+        latencies_ms = recent[:, 1] * 1000
+        return {
+            "uptime_seconds": round(now - self.started, 3),
+            "files": files,
+            "errors": errors,
+            "batches": batches,
+            "mean_batch_size": round(batched_files / batches, 3) if batches else 0.0,
+            "throughput_files_per_second": round(throughput, 3),
+            "latency_p50_ms": round(float(np.percentile(latencies_ms, 50)), 3) if len(latencies_ms) else None,
+            "latency_p99_ms": round(float(np.percentile(latencies_ms, 99)), 3) if len(latencies_ms) else None,
+        }
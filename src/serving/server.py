@@ -0,0 +1,172 @@
+import io
+import json
+import tempfile
+import time
+import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import src.constants as c
+from src.features.analysis import AudioAnalysis
+from src.features.labels import get_label_num_to_string
+from src.features.loading import FEATURE_EXTRACTORS
+from src.models.persistence import ModelArtifact
+from src.serving.batcher import MicroBatcher
+from src.serving.metrics import ServiceMetrics
+
+
+def _warm_up_worker(feature_type: str):
+    """
+    Runs the extractor once on silence, so librosa's filters and compiled kernels are ready for the first request.
+    Symbolic features are read from MIDI files instead, importing music21 is the slow part of their first request
+    """
+    extractor = FEATURE_EXTRACTORS[feature_type]
+    try:
+        if extractor.REQUIRES_AUDIO:
+            extractor.extract_features_from_analysis(AudioAnalysis(np.zeros(c.SAMPLES_PER_WAVE, dtype=np.float32)))
+        else:
+            import music21  # noqa: F401
+    except Exception:
+        pass
+
+
+def _extract_features(feature_type: str, source: str | bytes) -> np.ndarray:
+    """Features of a wave file, or of a MIDI file for symbolic features, given by its path or by its contents"""
+    extractor = FEATURE_EXTRACTORS[feature_type]
+    if extractor.REQUIRES_AUDIO:
+        audio = io.BytesIO(source) if isinstance(source, bytes) else source
+        return extractor.extract_features_from_analysis(AudioAnalysis.from_file(audio))
+
+    if isinstance(source, str):
+        return extractor.extract_features_from_file(Path(source))
+    # MIDI files are parsed from disk, so uploaded ones are written to a temporary file first
+    with tempfile.TemporaryDirectory() as temp_dir:
+        midi_path = Path(temp_dir) / "upload.mid"
+        midi_path.write_bytes(source)
+        return extractor.extract_features_from_file(midi_path)
+
+
+class InferenceService:
+    """
+    Classifies wave files, or MIDI files for symbolic models, with a model kept in memory. Files are featurized by a pool of worker
+    processes and their feature vectors are classified in micro-batches shared between requests
+    """
+
+    def __init__(self, artifact: ModelArtifact, workers: int = 1, max_batch_size: int = 32, max_wait_ms: float = 10):
+        self.artifact = artifact
+        self.metrics = ServiceMetrics()
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_warm_up_worker,
+            initargs=(artifact.feature_type,),
+        )
+        self.batcher = MicroBatcher(artifact.estimator.predict, max_batch_size, max_wait_ms / 1000, self.metrics)
+
+
+    def classify(self, sources: list[str | bytes]) -> list[dict]:
+        """
+        Classifies wave or MIDI files given by their paths or contents
+        :return: A result for every file in order, holding either its label or the error that occurred
+        """
+        start = time.perf_counter()
+        predictions = []
+        for source in sources:
+            prediction = Future()
+            extraction = self.pool.submit(_extract_features, self.artifact.feature_type, source)
+            extraction.add_done_callback(partial(self._on_extracted, prediction, start))
+            predictions.append(prediction)
+
+        results = []
+        for source, prediction in zip(sources, predictions):
+            name = "<upload>" if isinstance(source, bytes) else source
+            try:
+                result = {"file": name, "label": get_label_num_to_string(int(prediction.result())), "error": None}
+            except Exception as e:
+                result = {"file": name, "label": None, "error": str(e) or type(e).__name__}
+            result["latency_ms"] = round(prediction.latency * 1000, 3)
+            results.append(result)
+        return results
+
+
+    def _on_extracted(self, prediction: Future, start: float, extraction: Future):
+        # Every file joins a batch as soon as its features are ready, files of concurrent requests share batches
+        if extraction.exception() is not None:
+            self._finish(prediction, start, extraction)
+            return
+        self.batcher.submit(extraction.result()).add_done_callback(partial(self._finish, prediction, start))
+
+
+    def _finish(self, prediction: Future, start: float, outcome: Future):
+        # Latency of a file runs until its own prediction is ready, not until the whole request is done
+        prediction.latency = time.perf_counter() - start
+        self.metrics.record_file(prediction.latency, outcome.exception() is None)
+        if outcome.exception() is not None:
+            prediction.set_exception(outcome.exception())
+        else:
+            prediction.set_result(outcome.result())
+
+
+    def close(self):
+        self.batcher.close()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health   Model served by the service
+    GET  /metrics  Throughput, latency percentiles and batch sizes
+    POST /predict  Either a JSON body {"files": [paths]} of files readable by the server, or the contents of a wave file,
+                   or of a MIDI file when the model was trained on symbolic features
+    """
+    server: "InferenceServer"
+
+    def _send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._send_json(200, {"model": service.artifact.model_type, "feature_type": service.artifact.feature_type})
+        elif self.path == "/metrics":
+            self._send_json(200, service.metrics.snapshot())
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            try:
+                sources = [str(path) for path in json.loads(body)["files"]]
+            except (ValueError, KeyError, TypeError):
+                self._send_json(400, {"error": 'Expected a JSON body of the form {"files": [paths]}'})
+                return
+        else:
+            sources = [body]
+
+        self._send_json(200, {"predictions": self.server.service.classify(sources)})
+
+
+    def log_message(self, format, *args):
+        # Every request is counted in /metrics, logging each one would only slow the server down
+        pass
+
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: InferenceService):
+        super().__init__(address, InferenceRequestHandler)
+        self.service = service
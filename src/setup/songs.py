@@ -1,19 +1,93 @@
+import numpy as np
+import random
 import shutil
+from functools import partial
+from pathlib import Path
 from tqdm import tqdm
 
 import src.paths as paths
+import src.constants as c
+from src.music.enumeration import sample_stratified_progressions
+from src.music.generation import decode_progressions
+from src.music.render_cache import RenderCache
 from src.music.song import Song
+from src.constants import NUM_DEFAULT_SONGS
+from src.instrumentation import count
+from src.parallel import bounded_ordered_map
+from src.setup.soundfonts import setup_soundfonts
 
 
-NUM_DEFAULT_SONGS = 200
+def _write_song(job: tuple[Song, Path], render_cache: RenderCache | None = None) -> Song:
+    song, path = job
+    if render_cache is None:
+        song.write(path)
+    else:
+        song.write_samples(path, render_cache.render(song))
+    return song
 
 
-def generate_songs(num_songs: int = 50):
-    paths.INFO_DIATONIC_TXT.unlink(missing_ok=True)
-    paths.INFO_NON_DIATONIC_TXT.unlink(missing_ok=True)
+def resolve_seed(seed: int | None) -> int:
+    """:return: The seed, or a new one drawn from the global random generator when it is None"""
+    return random.getrandbits(64) if seed is None else seed
 
-    if paths.DATA_DIATONIC_DIR.exists(): shutil.rmtree(paths.DATA_DIATONIC_DIR)
-    if paths.DATA_NON_DIATONIC_DIR.exists(): shutil.rmtree(paths.DATA_NON_DIATONIC_DIR)
+
+def song_rng(seed: int, is_diatonic: bool, index: int) -> random.Random:
+    """
+    Random generator of a single song, derived from the seed of the dataset along with the label and index of the song.
+    Every song draws from its own generator, so it does not depend on any other song being created before it
+    """
+    seed_sequence = np.random.SeedSequence(seed, spawn_key=(int(is_diatonic), index))
+    return random.Random(int(seed_sequence.generate_state(1, np.uint64)[0]))
+
+
+def create_song(seed: int, is_diatonic: bool, index: int, functions: list | None = None) -> tuple[Song, Path]:
+    """
+    Creates a single song of the dataset along with its path, the same song create_songs creates for the seed
+    :param functions: Harmonic functions of the chords, drawn from the generator of the song by default
+    """
+    song = Song(is_diatonic, functions, song_rng(seed, is_diatonic, index))
+    if is_diatonic:
+        return song, paths.DATA_DIATONIC_DIR / f"diatonic_{index:03}.mid"
+    return song, paths.DATA_NON_DIATONIC_DIR / f"non_diatonic_{index:03}.mid"
+
+
+def create_songs(num_songs: int, unique_progressions: bool = False, seed: int | None = None):
+    """
+    Creates the songs of the dataset along with their paths, alternating between a diatonic and a non-diatonic song.
+    Songs are created lazily and in order, and every song only depends on the seed, its label and its index,
+    so any of them can be created again on its own with create_song
+    :param unique_progressions: Give every song of a label a distinct progression of functions, drawn uniformly
+                                from every valid progression of the label
+    :param seed: Seed of the dataset, drawn from the global random generator by default
+    """
+    seed = resolve_seed(seed)
+    functions = {True: [None] * num_songs, False: [None] * num_songs}
+    if unique_progressions:
+        # Distinct progressions can only be drawn for the whole dataset at once, from the seed of the dataset itself
+        sampled = sample_stratified_progressions(num_songs, c.NUM_CHORDS, np.random.default_rng(seed))
+        functions = {is_diatonic: decode_progressions(progressions) for is_diatonic, progressions in sampled.items()}
+
+    for i in range(num_songs):
+        yield create_song(seed, True, i, functions[True][i])
+        yield create_song(seed, False, i, functions[False][i])
+
+
+def generate_songs(
+        num_songs: int = 50,
+        render_workers: int = 1,
+        render_cache: RenderCache | None = None,
+        unique_progressions: bool = False,
+        seed: int | None = None,
+):
+    """
+    Generates and renders num_songs diatonic and num_songs non-diatonic songs
+    :param num_songs: Number of songs to generate per label
+    :param render_workers: Number of songs rendered at once
+    :param render_cache: Cache of previously rendered songs, duplicate songs reuse its audio instead of being rendered
+    :param unique_progressions: Give every song of a label a distinct progression of functions
+    :param seed: Seed the songs are generated from, a random one by default
+    """
+    seed = replace_dataset(seed, "Generating")
     paths.DATA_DIATONIC_DIR.mkdir(parents=True, exist_ok=True)
     paths.DATA_NON_DIATONIC_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -21,21 +95,62 @@ def generate_songs(num_songs: int = 50):
     with paths.INFO_DIATONIC_TXT.open("w") as diatonic_info, \
         paths.INFO_NON_DIATONIC_TXT.open("w") as non_diatonic_info:
 
-        for i in tqdm(range(num_songs), desc="Generating songs"):
-            diatonic_path     = paths.DATA_DIATONIC_DIR / f"diatonic_{i:03}.mid"
-            non_diatonic_path = paths.DATA_NON_DIATONIC_DIR / f"non_diatonic_{i:03}.mid"
+        # Results come back in submission order, so the manifests list the songs in the order of their filenames
+        write_song = partial(_write_song, render_cache=render_cache)
+        songs = create_songs(num_songs, unique_progressions, seed)
+        rendered = bounded_ordered_map(write_song, songs, render_workers)
+        for song in tqdm(rendered, total=2 * num_songs, desc="Generating songs"):
+            info = diatonic_info if song.is_diatonic else non_diatonic_info
+            info.write(f"{song.string_info()}\n")
+            count("songs.generated")
+
+    if render_cache is not None:
+        print(render_cache.report())
+
+
+def replace_dataset(seed: int | None, action: str) -> int:
+    """
+    Prepares the generation of a new dataset. The songs, info manifests and feature sets of the previous dataset are
+    removed, so they never get mixed with the new ones, and the soundfont catalog is brought up to date. Songs draw
+    their presets from the catalog, so it is only set up here, when songs are about to be generated
+    :param action: How the songs are generated, printed along with the seed
+    :return: The seed the songs are generated from, a new one when seed is None
+    """
+    seed = resolve_seed(seed)
+    print(f"{action} songs with seed {seed}")
+
+    paths.INFO_DIATONIC_TXT.unlink(missing_ok=True)
+    paths.INFO_NON_DIATONIC_TXT.unlink(missing_ok=True)
+    if paths.DATA_DIATONIC_DIR.exists(): shutil.rmtree(paths.DATA_DIATONIC_DIR)
+    if paths.DATA_NON_DIATONIC_DIR.exists(): shutil.rmtree(paths.DATA_NON_DIATONIC_DIR)
+    clear_feature_caches()
 
-            diatonic_song = Song(is_diatonic=True)
-            non_diatonic_song = Song(is_diatonic=False)
+    setup_soundfonts()
+    return seed
 
-            diatonic_song.write(diatonic_path)
-            non_diatonic_song.write(non_diatonic_path)
 
-            diatonic_info.write(f"{diatonic_song.string_info()}\n")
-            non_diatonic_info.write(f"{non_diatonic_song.string_info()}\n")
+def clear_feature_caches():
+    """Removes the cached feature sets, which no longer match the dataset once songs are regenerated"""
+    # The feature store and render cache are keyed by their contents and the voicing table does not depend on
+    # the songs, so they stay valid and are kept
+    if paths.CACHE_DIR.exists():
+        for path in paths.CACHE_DIR.iterdir():
+            if path in (paths.FEATURE_STORE_DIR, paths.RENDER_CACHE_DIR, paths.VOICINGS_TABLE):
+                continue
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
 
 
-def setup_songs(num_songs: int = NUM_DEFAULT_SONGS, force_setup: bool = False):
+def setup_songs(
+        num_songs: int = NUM_DEFAULT_SONGS,
+        force_setup: bool = False,
+        render_workers: int = 1,
+        use_render_cache: bool = False,
+        unique_progressions: bool = False,
+        seed: int | None = None,
+):
     diatonic_songs     = list(paths.DATA_DIATONIC_DIR.glob("*.wav"))
     non_diatonic_songs = list(paths.DATA_NON_DIATONIC_DIR.glob("*.wav"))
 
@@ -43,5 +158,4 @@ def setup_songs(num_songs: int = NUM_DEFAULT_SONGS, force_setup: bool = False):
     if not force_setup and songs_exist:
         return
 
-    shutil.rmtree(paths.CACHE_DIR, ignore_errors=True)
-    generate_songs(num_songs)
+    generate_songs(num_songs, render_workers, RenderCache() if use_render_cache else None, unique_progressions, seed)
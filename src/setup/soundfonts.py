@@ -1,14 +1,12 @@
 import json
-import py7zr
 import shutil
 import urllib.parse
 import urllib.request
 import zipfile
-
-from sf2utils.sf2parse import Sf2File
 from pathlib import Path
 
 import src.paths as paths
+from src.files import atomic_write, hash_file
 
 DOWNLOAD_URLS: dict[str, str] = {
     "FluidR3_GM": "https://keymusician01.s3.amazonaws.com/FluidR3_GM.zip",
@@ -19,6 +17,9 @@ def _unzip(zip_path: Path, extract_path: Path):
         with zipfile.ZipFile(zip_path, "r") as zip_file:
             zip_file.extractall(extract_path)
     elif zip_path.suffix == ".7z":
+        # py7zr is only needed for 7z archives, it is not imported on every run
+        import py7zr
+
         with py7zr.SevenZipFile(zip_path, "r") as zip_file:
             zip_file.extractall(extract_path)
     else:
@@ -26,13 +27,12 @@ def _unzip(zip_path: Path, extract_path: Path):
 
 
 def _download_soundfonts() -> None:
-    paths.TEMP_SOUNDFONTS_DIR.mkdir(parents=True, exist_ok=True)
+    """Downloads every soundfont of DOWNLOAD_URLS that is not in the sf2 folder yet, nothing is fetched otherwise"""
     paths.SOUNDFONTS_SF2_DIR.mkdir(parents=True, exist_ok=True)
 
     for name, download_url in DOWNLOAD_URLS.items():
         dest_path = paths.SOUNDFONTS_SF2_DIR / f"{name}.sf2"
         if dest_path.exists():
-            print(f"Soundfont already exists: {dest_path}")
             continue
 
         parsed_url = urllib.parse.urlparse(download_url)
@@ -64,54 +64,101 @@ def _download_soundfonts() -> None:
 
         zip_path.unlink()
         shutil.rmtree(extract_path)
-    shutil.rmtree(paths.TEMP_DIR)
 
+    # Only the downloads are removed, the rest of the temp folder may be in use by FluidSynth
+    if paths.TEMP_SOUNDFONTS_DIR.exists():
+        shutil.rmtree(paths.TEMP_SOUNDFONTS_DIR)
 
-def _analyze_sf2_folder():
+
+def _fingerprint(filepath: Path, previous: dict | None = None) -> dict:
     """
-    Analyze all sf2 files in the soundfont folder and creates a catalog of their contents.
-    Returns a dictionary mapping each sf2 file to its preset.
-    :return:
+    Size, modification time and content hash of an sf2 file. The hash of the previous fingerprint is reused
+    when the size and modification time did not change, so unchanged soundfonts are never read
     """
+    stat = filepath.stat()
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if previous is not None and all(previous.get(key) == value for key, value in fingerprint.items()):
+        fingerprint["sha256"] = previous["sha256"]
+    else:
+        fingerprint["sha256"] = hash_file(filepath)
+    return fingerprint
 
-    if not paths.SOUNDFONTS_SF2_DIR.exists():
-        raise FileNotFoundError(f"Soundfonts folder {paths.SOUNDFONTS_SF2_DIR} does not exist")
 
-    catalog = {}
-    for filepath in paths.SOUNDFONTS_SF2_DIR.glob("*.sf2"):
-        try:
-            with filepath.open(mode="rb") as sf2_file:
-                sf2 = Sf2File(sf2_file)
-
-            presets = []
-            for preset in sf2.presets:
-                if preset.name == "EOP": continue
-                if preset.preset == 255: continue
-                presets.append({
-                    "name": preset.name.strip(),
-                    "bank": preset.bank,
-                    "preset": preset.preset
-                })
-            catalog[filepath.name] = {
-                "path": str(filepath),
-                "presets": presets,
-            }
+def _analyze_sf2_file(filepath: Path) -> list[dict]:
+    """:return: Every preset of the soundfont, except the end of presets marker and the percussion kits"""
+    from sf2utils.sf2parse import Sf2File
 
-        except Exception as e:
-            print(e)
+    with filepath.open(mode="rb") as sf2_file:
+        sf2 = Sf2File(sf2_file)
 
-    return catalog
+    presets = []
+    for preset in sf2.presets:
+        if preset.name == "EOP": continue
+        if preset.preset == 255: continue
+        presets.append({
+            "name": preset.name.strip(),
+            "bank": preset.bank,
+            "preset": preset.preset
+        })
+    return presets
+
+
+def _load_catalog(catalog_path: Path) -> dict:
+    if not catalog_path.exists():
+        return {}
+    try:
+        with catalog_path.open() as catalog_file:
+            return json.load(catalog_file)
+    except json.JSONDecodeError:
+        return {}
 
 
 def _save_catalog(catalog, output_path: Path = paths.SOUNDFONTS_CATALOG):
     """Save the catalog toa JSON file"""
-    with output_path.open(mode="w") as output_file:
+    with atomic_write(output_path, "w") as output_file:
         json.dump(catalog, output_file, indent=4)
     print(f"Soundfont catalog saved to {output_path}")
 
 
+def update_catalog(catalog_path: Path = paths.SOUNDFONTS_CATALOG) -> dict:
+    """
+    Brings the catalog of the sf2 folder up to date. Every soundfont is fingerprinted, and only the ones that are new
+    or whose contents changed since the catalog was written are analyzed again. Removed soundfonts are dropped
+    :return: Dictionary mapping each sf2 file to its path, fingerprint and presets
+    """
+    if not paths.SOUNDFONTS_SF2_DIR.exists():
+        raise FileNotFoundError(f"Soundfonts folder {paths.SOUNDFONTS_SF2_DIR} does not exist")
+
+    previous = _load_catalog(catalog_path)
+    catalog = {}
+    num_analyzed = 0
+    for filepath in sorted(paths.SOUNDFONTS_SF2_DIR.glob("*.sf2")):
+        entry = previous.get(filepath.name, {})
+        fingerprint = _fingerprint(filepath, entry.get("fingerprint"))
+        if entry.get("fingerprint", {}).get("sha256") == fingerprint["sha256"]:
+            catalog[filepath.name] = {**entry, "path": str(filepath), "fingerprint": fingerprint}
+            continue
+
+        try:
+            presets = _analyze_sf2_file(filepath)
+        except Exception as e:
+            print(f"Unable to analyze soundfont '{filepath}': {e}")
+            continue
+        catalog[filepath.name] = {
+            "path": str(filepath),
+            "fingerprint": fingerprint,
+            "presets": presets,
+        }
+        num_analyzed += 1
+
+    if catalog != previous:
+        if num_analyzed:
+            print(f"Analyzed {num_analyzed} new or changed soundfonts")
+        _save_catalog(catalog, catalog_path)
+    return catalog
+
+
 def setup_soundfonts():
+    """Downloads the missing soundfonts and updates their catalog. Works offline once every soundfont is present"""
     _download_soundfonts()
-    catalog = _analyze_sf2_folder()
-    _save_catalog(catalog)
-
+    update_catalog()
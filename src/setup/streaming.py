@@ -0,0 +1,176 @@
+import os
+from functools import partial
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+import src.constants as c
+import src.paths as paths
+from src.features.analysis import AudioAnalysis
+from src.features.cache_format import DEFAULT_CACHE_FORMAT
+from src.features.extractor import extract_analysis_features
+from src.features.labels import dataset_labels
+from src.features.loading import FEATURE_EXTRACTORS
+from src.features.store import FeatureStore
+from src.instrumentation import call_with_metrics, count, merge_worker_metrics
+from src.music.fluidsynth import get_synthesis_backend, set_synthesis_backend, to_mono_float
+from src.music.render_cache import RenderCache
+from src.parallel import bounded_ordered_map
+from src.setup.songs import create_songs, replace_dataset
+
+
+# Songs rendered and featurized ahead of the consumer per worker before generation pauses
+STREAM_IN_FLIGHT_PER_WORKER = 4
+
+
+def _render_and_featurize(song, extractors, cache_roots):
+    """
+    Renders and featurizes a song. With a render cache, the features of a song identical to a
+    previously streamed one are read from the feature store, and its audio from the render cache
+    :return: (results, reused): a (features, error) pair for each extractor, and whether the
+             audio or features of an identical song were reused
+    """
+    if cache_roots is None:
+        signal = to_mono_float(song.render())[:c.SAMPLES_PER_WAVE]
+        return extract_analysis_features(extractors, AudioAnalysis(signal)), False
+
+    render_cache_root, feature_store_root = cache_roots
+    render_cache = RenderCache(render_cache_root)
+    store = FeatureStore(feature_store_root)
+    render_key = song.render_key()
+    # Streamed songs have no file to hash, the render key identifies their audio instead
+    content_key = f"render-{render_key}"
+
+    stored = [store.get(extractor, content_key) for extractor in extractors]
+    if all(features is not None for features in stored):
+        return [(features, None) for features in stored], True
+
+    samples = render_cache.get(render_key)
+    reused = samples is not None
+    if samples is None:
+        samples = song.render()
+        render_cache.put(render_key, samples)
+
+    signal = to_mono_float(samples)[:c.SAMPLES_PER_WAVE]
+    results = extract_analysis_features(extractors, AudioAnalysis(signal))
+    for extractor, (features, _) in zip(extractors, results):
+        if features is not None:
+            store.put(extractor, content_key, features)
+    return results, reused
+
+
+def _featurize_song(job):
+    """
+    Renders and featurizes a song, see _render_and_featurize. A song that fails to render is reported
+    by the consumer and skipped, like a file that fails to decode, instead of aborting the whole stream
+    :return: (song, results, reused, error): results is None when the song could not be rendered
+    """
+    song, extractors, cache_roots = job
+    try:
+        return song, *_render_and_featurize(song, extractors, cache_roots), None
+    except Exception as e:
+        return song, None, False, e
+
+
+def stream_songs(
+        num_songs: int,
+        feature_types: list[str],
+        workers: int = 1,
+        cache_format: str = DEFAULT_CACHE_FORMAT,
+        render_cache: RenderCache | None = None,
+        unique_progressions: bool = False,
+        seed: int | None = None,
+):
+    """
+    Generates num_songs diatonic and num_songs non-diatonic songs and featurizes them in memory.
+    Every song goes straight from synthesis to feature extraction without writing audio to disk,
+    only the feature set caches and the info manifests are persisted. Generation is paused while
+    the workers are busy, so memory use does not grow with the number of songs
+    :param num_songs: Number of songs to generate per label
+    :param feature_types: Feature types to extract from every song
+    :param workers: Number of worker processes that synthesize and featurize songs
+    :param cache_format: Format of the feature set caches
+    :param render_cache: Cache of previously rendered songs. When given, duplicate songs reuse the audio
+                         and, through the feature store, the features of the first identical song
+    :param unique_progressions: Give every song of a label a distinct progression of functions
+    :param seed: Seed the songs are generated from, a random one by default
+    :return: Mapping of feature type to the unscaled (X, y), ordered by label then song index
+    """
+    extractors = [FEATURE_EXTRACTORS[feature_type] for feature_type in feature_types]
+    # Symbolic features are computed from the songs themselves, only the others need the songs to be rendered
+    audio_extractors = [extractor for extractor in extractors if extractor.REQUIRES_AUDIO]
+    song_extractors = [extractor for extractor in extractors if not extractor.REQUIRES_AUDIO]
+    labels = dataset_labels()
+
+    seed = replace_dataset(seed, "Streaming")
+
+    # features[is_diatonic][feature_type] holds the feature vectors of every song of that label
+    features = {
+        dataset_label.is_diatonic: {extractor.FEATURE_NAME: [] for extractor in extractors} for dataset_label in labels
+    }
+
+    num_workers = workers if workers > 0 else os.cpu_count()
+    executor = None
+    if num_workers != 1 and audio_extractors:
+        executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=set_synthesis_backend,
+            initargs=(get_synthesis_backend(),),
+        )
+
+    try:
+        paths.INFO_DIR.mkdir(parents=True, exist_ok=True)
+        with paths.INFO_DIATONIC_TXT.open("w") as diatonic_info, \
+            paths.INFO_NON_DIATONIC_TXT.open("w") as non_diatonic_info:
+
+            cache_roots = None
+            if render_cache is not None:
+                # Kept next to the renders rather than in the dataset feature store, which prunes entries without a file
+                cache_roots = (render_cache.root, render_cache.root / "features")
+            if audio_extractors:
+                songs = create_songs(num_songs, unique_progressions, seed)
+                jobs = ((song, audio_extractors, cache_roots) for song, _ in songs)
+                max_in_flight = STREAM_IN_FLIGHT_PER_WORKER * num_workers
+                featurize = _featurize_song
+                if executor is not None:
+                    # Worker processes send back the timings of their songs along with the features
+                    featurize = partial(call_with_metrics, _featurize_song)
+                results = bounded_ordered_map(featurize, jobs, num_workers, max_in_flight, executor)
+                if executor is not None:
+                    results = map(merge_worker_metrics, results)
+            else:
+                results = ((song, [], False, None) for song, _ in create_songs(num_songs, unique_progressions, seed))
+            for song, song_results, reused, error in tqdm(results, total=2 * num_songs, desc="Streaming songs"):
+                if error is not None:
+                    print(f"Unable to render song '{song.string_info().strip()}': {error}")
+                    count("streaming.failed_songs")
+                    song_results = []
+                elif render_cache is not None and audio_extractors:
+                    render_cache.record(reused)
+                info = diatonic_info if song.is_diatonic else non_diatonic_info
+                info.write(f"{song.string_info()}\n")
+                count("songs.generated")
+
+                for extractor in song_extractors:
+                    features[song.is_diatonic][extractor.FEATURE_NAME].append(extractor.extract_features_from_song(song))
+                for extractor, (song_features, error) in zip(audio_extractors, song_results):
+                    if error is not None:
+                        print(f"Unable to process song '{song.string_info().strip()}' for {extractor.FEATURE_NAME}: {error}")
+                        count(f"extraction.errors.{extractor.FEATURE_NAME}")
+                        continue
+                    features[song.is_diatonic][extractor.FEATURE_NAME].append(song_features)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    if render_cache is not None:
+        print(render_cache.report())
+
+    feature_sets = {}
+    for extractor in extractors:
+        name = extractor.FEATURE_NAME
+        ordered = [(features[dataset_label.is_diatonic][name], dataset_label.label) for dataset_label in labels]
+        X = np.array([row for rows, _ in ordered for row in rows])
+        y = np.array([label for rows, label in ordered for _ in rows])
+        feature_sets[name] = extractor.save_features(X, y, cache_format)
+    return feature_sets
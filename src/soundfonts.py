@@ -44,13 +44,14 @@ def _load_catalog():
     return _catalog
 
 
-def get_random_soundfont_preset():
+def get_random_soundfont_preset(rng: random.Random | None = None):
     """
     Get a random preset from the catalog
     :return:
     """
+    rng = rng or random
     catalog = _load_catalog()
-    soundfont_name = random.choice(list(catalog.keys()))
+    soundfont_name = rng.choice(list(catalog.keys()))
     soundfont_info = catalog[soundfont_name]
 
     all_presets = list(soundfont_info["presets"])
@@ -59,7 +60,7 @@ def get_random_soundfont_preset():
     if not all_presets:
         raise ValueError("No presets found")
 
-    preset = random.choice(all_presets)
+    preset = rng.choice(all_presets)
     return {
         "path": soundfont_info["path"],
         "name": preset["name"],
@@ -4,26 +4,19 @@ import numpy as np
 import src.constants as c
 import src.paths as paths
 from src.features.mfcc import NUM_MFCCS, NUM_MFCC_STATS, mfcc_feature_index, mfcc_stat_index_to_str
+from src.visualization.report import Report
 
 
-def _plot_single_mfcc_per_chord_box_plot(X, y, mfcc_index, stat_index):
+def _plot_single_mfcc_per_chord_box_plot(diatonic_data, non_diatonic_data, mfcc_index, stat_index):
+    """
+    :param diatonic_data: Values of the MFCC statistic of every diatonic song, one array per chord
+    :param non_diatonic_data: Values of the MFCC statistic of every non-diatonic song, one array per chord
+    """
     positions_diatonic = np.arange(1, c.NUM_CHORDS + 1) - 0.2
     positions_non_diatonic = np.arange(1, c.NUM_CHORDS + 1) + 0.2
 
     plt.figure(figsize=(12, 6))
 
-    X_diatonic = X[y == 0]
-    X_non_diatonic = X[y == 1]
-
-    diatonic_data = []
-    non_diatonic_data = []
-
-    for chord in range(c.NUM_CHORDS):
-        col = mfcc_feature_index(mfcc_index, chord, stat_index)
-
-        diatonic_data.append(X_diatonic[:, col])
-        non_diatonic_data.append(X_non_diatonic[:, col])
-
     bp1 = plt.boxplot(
         diatonic_data,
         positions=positions_diatonic,
@@ -60,13 +53,19 @@ def _plot_single_mfcc_per_chord_box_plot(X, y, mfcc_index, stat_index):
 
     plt.tight_layout()
 
-    paths.GRAPHS_MFCC_DIR.mkdir(exist_ok=True, parents=True)
-    filename = paths.GRAPHS_MFCC_DIR / f"per-chord_distribution_of_mfcc{mfcc_index + 1}_{mfcc_stat_index_to_str(stat_index)}_box_plot"
-    plt.savefig(filename)
-    plt.close()
 
+def plot_mfcc_per_chord_box_plot(X, y, report: Report):
+    """Adds a box plot for every MFCC statistic to the report"""
+    X_diatonic = X[y == 0]
+    X_non_diatonic = X[y == 1]
 
-def plot_mfcc_per_chord_box_plot(X, y):
     for mfcc_index in range(NUM_MFCCS):
         for stat_index in range(NUM_MFCC_STATS):
-            _plot_single_mfcc_per_chord_box_plot(X, y, mfcc_index, stat_index)
+            # Only the columns of the plot are sent to the process rendering it
+            cols = [mfcc_feature_index(mfcc_index, chord, stat_index) for chord in range(c.NUM_CHORDS)]
+            diatonic_data = [np.asarray(X_diatonic[:, col]) for col in cols]
+            non_diatonic_data = [np.asarray(X_non_diatonic[:, col]) for col in cols]
+
+            filename = paths.GRAPHS_MFCC_DIR / f"per-chord_distribution_of_mfcc{mfcc_index + 1}_{mfcc_stat_index_to_str(stat_index)}_box_plot.png"
+            report.add(_plot_single_mfcc_per_chord_box_plot, filename,
+                       diatonic_data, non_diatonic_data, mfcc_index, stat_index)
@@ -4,10 +4,14 @@ from sklearn.model_selection import learning_curve, StratifiedKFold
 from sklearn.utils import shuffle
 
 
-def plot_learning_curve(model, X, y):
+def plot_learning_curve(model, X, y, num_sizes: int = 20):
+    """
+    Computes the learning curve of the model and draws it onto a new figure
+    :param num_sizes: Number of training set sizes between 10% and 100% of the data, each fitted once per fold
+    """
     X, y = shuffle(X, y, random_state=42)
 
-    train_sizes = np.linspace(0.1, 1.0, 20)
+    train_sizes = np.linspace(0.1, 1.0, num_sizes)
 
     cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
     train_sizes_abs, train_scores, val_scores = learning_curve(
@@ -39,5 +43,4 @@ def plot_learning_curve(model, X, y):
     plt.title('Learning Curves')
     plt.legend(loc='best')
     plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    plt.tight_layout()
\ No newline at end of file
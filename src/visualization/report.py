@@ -0,0 +1,61 @@
+import matplotlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+# Figures are only ever written to files, a non-interactive backend never blocks and works without a display
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+
+def use_headless_backend():
+    matplotlib.use("Agg")
+
+
+def _render_figure(job: tuple[Callable, Path, tuple]) -> Path:
+    plot, path, args = job
+    plot(*args)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    plt.savefig(path)
+    plt.close("all")
+    return path
+
+
+class Report:
+    """
+    Figures of a run, collected while the run goes on and rendered together once it is done.
+    A figure is a plot function drawing onto the current matplotlib figure, along with its arguments.
+    Plot functions and their arguments have to be picklable, so figures can be rendered in worker processes
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.figures: list[tuple[Callable, Path, tuple]] = []
+
+
+    def add(self, plot: Callable, filename: str | Path, *args):
+        """
+        :param plot: Function drawing the figure from args
+        :param filename: Path of the figure relative to the directory of the report, or an absolute path
+        """
+        self.figures.append((plot, self.directory / filename, args))
+
+
+def render_reports(reports: list[Report], workers: int = -1) -> list[Path]:
+    """
+    Renders the figures of every report, independent figures are rendered at the same time
+    :param workers: Number of worker processes rendering figures, -1 uses every core
+    :return: Paths of the written figures
+    """
+    figures = [figure for report in reports for figure in report.figures]
+    num_workers = workers if workers > 0 else os.cpu_count()
+    if num_workers == 1 or len(figures) <= 1:
+        written = [_render_figure(figure) for figure in figures]
+    else:
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(figures)), initializer=use_headless_backend) as executor:
+            written = list(executor.map(_render_figure, figures))
+
+    for report in reports:
+        report.figures = []
+    return written
@@ -1,22 +1,13 @@
 import matplotlib.pyplot as plt
 from sklearn.metrics import roc_curve, auc
-from sklearn.model_selection import train_test_split
 
 
-def plot_roc_curve(model, X, y, test_size=0.2, random_state=42):
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=random_state, stratify=y
-    )
-
-    model.fit(X_train, y_train)
-
-    if hasattr(model, "predict_proba"):
-        y_score = model.predict_proba(X_test)[:, 1]
-    elif hasattr(model, "decision_function"):
-        y_score = model.decision_function(X_test)
-    else:
-        raise ValueError("Model does not have predict_proba or decision_function method.")
-
+def plot_roc_curve(y_test, y_score):
+    """
+    Draws the ROC curve onto a new figure
+    :param y_test: Labels of the test split
+    :param y_score: Scores of the positive class predicted by an already fitted model for the test split
+    """
     fpr, tpr, _ = roc_curve(y_test, y_score)
     roc_auc = auc(fpr, tpr)
 
@@ -29,6 +20,5 @@ def plot_roc_curve(model, X, y, test_size=0.2, random_state=42):
     plt.legend(loc="lower right")
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.show()
 
     return roc_auc
\ No newline at end of file